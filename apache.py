@@ -1,18 +1,37 @@
 
-import httpx
-from bs4 import BeautifulSoup
+from bs4 import SoupStrainer
+import logging
 import re
-from utils import VersionHandling
+from contextlib import closing
+from utils import Release, VersionHandling, make_client, make_soup, serialize_releases, sort_versions, stream_lines
+from registry import Scraper
 import json
 import os
+import metrics
 
-class ApacheScrape:
-    def __init__(self):
+# Only the changelog headings are parsed out of the changelog page
+CHANGELOG_HEADINGS = SoupStrainer("b")
+# A 2.4 source tarball link in the archive's autoindex listing
+LISTING_TARBALL = re.compile(r'>httpd-(2\.4\.\d+)\.tar\.bz2<')
+
+class ApacheScrape(Scraper):
+    name = "apache"
+
+    def __init__(self, client=None):
+        super().__init__(client)
         self.url = "https://archive.apache.org/dist/httpd/"
         self.changelog_url = "https://www.apachelounge.com/Changelog-2.4.html"
         self.min_version = "2.4.51"
         self.max_version = "2.4.65"
         self.last_v16_version = "2.4.57"
+        # Pre-parsed bounds, compared against every listing and changelog line
+        v2tuple = VersionHandling.v2tuple
+        self.min_key = v2tuple(self.min_version)
+        self.max_key = v2tuple(self.max_version)
+        self.last_v16_key = v2tuple(self.last_v16_version)
+
+    def run(self, **options):
+        return self.scrape(**options)
 
     def date_converter(self, text):
         """
@@ -31,55 +50,30 @@ class ApacheScrape:
             return year[2:] + month + day
         return None
     
-    def remove_date_size(self, text):
-        """
-        Removes trailing date/size info from a line, e.g.,
-        'httpd-2.4.63.tar.bz2                2025-01-23 20:00  7.2M' -> 'httpd-2.4.63.tar.bz2'
-        """
-        # Remove everything from the first date pattern to the end
-        return re.sub(r'\s+\d{4}-\d{2}-\d{2} \d{2}:\d{2}\s+\S+$', '', text.strip())
-    
-    def filter_version(self, text):
-        """
-        Exclude unwanted entries based on specific keywords, file extensions, [TXT] labels.
-        """
-        exclude_keywords = [
-            "Announcement", "CHANGES", "CURRENT-IS-", "KEYS", "META",
-            ".asc", ".tar.gz", ".Z", ".tar_Z.asc", "os2.zip", ".md5",
-            "-src", "sha1", "-beta", "-alpha", "-deps", "-netware",
-            "apache", "[TXT]", ".sha256", ".png", ".sha512"
-        ]
-        if "httpd" not in text.lower():
-            return False
-        for keyword in exclude_keywords:
-            if keyword.lower() in text.lower():
-                return False
-        return True
-
     def version_in_range(self, version):
-        v2tuple = VersionHandling.v2tuple
-        return v2tuple(self.min_version) <= v2tuple(version) <= v2tuple(self.max_version)
+        return self.min_key <= VersionHandling.v2tuple(version) <= self.max_key
 
     def scrape_version(self, html=None):
+        """
+        Return the in-range release names (e.g. "httpd-2.4.63") of the archive listing.
+
+        The autoindex page has one file per line, so it is streamed and matched
+        line by line with a single regex instead of being parsed into a DOM.
+        """
         # If html is provided, use it (for testing); otherwise fetch from the web
-        if html is None:
-            response = httpx.get(self.url)
-            html = response.text
-        bs = BeautifulSoup(html, "html.parser")
+        if html is not None:
+            return self.scan_listing(html.splitlines())
+        with closing(stream_lines(self.url, self.client)) as lines:
+            return self.scan_listing(lines)
+
+    def scan_listing(self, lines):
+        """Collect in-range release names from autoindex listing lines."""
         results = []
-        for pre in bs.find_all('pre'):
-            for line in pre.text.splitlines():
-                if self.filter_version(line):
-                    clean = self.remove_date_size(line)
-                    # Extract version from filename
-                    m = re.search(r'httpd-(2\.4\.\d+)\.tar\.bz2', clean)
-                    if m:
-                        version = m.group(1)
-                        if self.version_in_range(version):
-                            # Strip .tar.bz2 from the filename
-                            clean = re.sub(r'\.tar\.bz2$', '', clean)
-                            results.append(clean)
-            return results
+        for line in lines:
+            m = LISTING_TARBALL.search(line)
+            if m and self.version_in_range(m.group(1)):
+                results.append(f"httpd-{m.group(1)}")
+        return results
     
 
     def scrape_changelog(self, html=None):
@@ -94,12 +88,11 @@ class ApacheScrape:
             "priority": "u=0, i"
         }
         if html is None:
-            rs = httpx.get(self.changelog_url, headers=header)
+            rs = self.client.get(self.changelog_url, headers=header)
             html = rs.text
-            print("[DEBUG] changelog HTML preview:")
-            print(html[:500])
-        print(f"[DEBUG] changelog HTML length: {len(html)}")
-        bs = BeautifulSoup(html, "html.parser")
+            logging.debug(f"changelog HTML preview: {html[:500]}")
+        logging.debug(f"changelog HTML length: {len(html)}")
+        bs = make_soup(html, CHANGELOG_HEADINGS)
         results = []
         match_count = 0
         # Find all <b> tags with text like '07-October-2021 Changes with Apache 2.4.51'
@@ -113,7 +106,8 @@ class ApacheScrape:
                 if self.version_in_range(version):
                     date_conv = self.date_converter(date_str)
                     results.append({"version": version, "date": date_conv})
-        print(f"[DEBUG] changelog matches found: {match_count}, in-range: {len(results)}")
+        logging.debug(f"changelog matches found: {match_count}, in-range: {len(results)}")
+        metrics.event(type="changelog", product="apache", matches=match_count, in_range=len(results))
         return results
 
 
@@ -132,7 +126,8 @@ class ApacheScrape:
         # Build a map from version to date code
         version_date = {entry['version']: entry['date'] for entry in changelog_list if entry.get('date')}
 
-        # Collect all builds for all versions
+        # Collect all builds for all versions, Apache builds from ApacheLounge
+        # are Windows-specific and don't provide GPG signatures
         builds_data = []
         for vstr in version_list:
             # vstr is like 'httpd-2.4.63', extract version
@@ -145,49 +140,31 @@ class ApacheScrape:
                 continue
             
             # VS17 builds (always available)
-            builds_data.append({
-                "version": version,
-                "link": f"https://www.apachelounge.com/download/VS17/binaries/httpd-{version}-{date_code}-win64-VS17.zip"
-            })
-            builds_data.append({
-                "version": version,
-                "link": f"https://www.apachelounge.com/download/VS17/binaries/httpd-{version}-{date_code}-win32-VS17.zip"
-            })
+            for arch in ("win64", "win32"):
+                builds_data.append(Release(
+                    version,
+                    f"https://www.apachelounge.com/download/VS17/binaries/httpd-{version}-{date_code}-{arch}-VS17.zip",
+                    os=("Windows",),
+                    arch=arch,
+                ))
             
             # VS16 builds (only for versions <= last_v16_version)
-            if v2tuple(version) <= v2tuple(self.last_v16_version):
-                builds_data.append({
-                    "version": version,
-                    "link": f"https://www.apachelounge.com/download/vs16/binaries/httpd-{version}-{date_code}-win64-vs16.zip"
-                })
-                builds_data.append({
-                    "version": version,
-                    "link": f"https://www.apachelounge.com/download/vs16/binaries/httpd-{version}-{date_code}-win32-vs16.zip"
-                })
+            if v2tuple(version) <= self.last_v16_key:
+                for arch in ("win64", "win32"):
+                    builds_data.append(Release(
+                        version,
+                        f"https://www.apachelounge.com/download/vs16/binaries/httpd-{version}-{date_code}-{arch}-vs16.zip",
+                        os=("Windows",),
+                        arch=arch,
+                    ))
         
         # Sort builds by version in descending order
-        def version_key(item):
-            v = item["version"]
-            return tuple(int(x) if x.isdigit() else 0 for x in v.split(".")) if v else (0,)
-        
-        sorted_builds = sorted(builds_data, key=version_key, reverse=True)
-        
-        # Create data for Windows only (Apache builds are Windows-specific from ApacheLounge)
-        os_data = []
-        
-        # Windows data (all builds)
-        windows_data = []
-        for build in sorted_builds:
-            windows_data.append({
-                "version": build["version"],
-                "gpg": "",  # Apache builds from ApacheLounge don't provide GPG signatures
-                "link": build["link"]
-            })
-        os_data.append({"os": "Windows", "data": windows_data})
+        sorted_builds = sort_versions(builds_data, key=lambda build: build.version)
         
-        return {"apache": os_data}
+        return serialize_releases("apache", sorted_builds, os_names=("Windows",))
 
 if __name__ == "__main__":
+    import catalog
     print("Scraping Apache versions...")
     scraper = ApacheScrape()
 
@@ -197,7 +174,7 @@ if __name__ == "__main__":
         with open(changelog_path, "r", encoding="utf-8") as f:
             changelog_html = f.read()
     else:
-        with httpx.Client() as session:
+        with make_client() as session:
             header = {
                 "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3",
                 "referer": "https://www.apachelounge.com/viewtopic.php?p=43274",
@@ -218,9 +195,8 @@ if __name__ == "__main__":
     changelog_list = scraper.scrape_changelog(html=changelog_html)  # Use real online data
     result = scraper.scrape(version_list=version_list, changelog_list=changelog_list)
     
-    # Save to JSON file like mysql.py does
-    with open("assets/apache.json", "w", encoding="utf-8") as f:
-        json.dump(result, f, indent=2, ensure_ascii=False)
+    # Written atomically, and merged into assets/catalog.json
+    catalog.publish(result, "apache.json")
     
     print("Saved all Apache download info to assets/apache.json")
     print(json.dumps(result, indent=2, ensure_ascii=False))
@@ -0,0 +1,82 @@
+"""Time ``catalog.Catalog`` lookups against scanning the nested catalog lists.
+
+    python benchmarks/bench_catalog.py                              # assets/catalog.json
+    python benchmarks/bench_catalog.py --catalog assets/catalog.packed.json
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import catalog
+import utils
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+v2tuple = utils.VersionHandling.v2tuple
+
+
+def scan_group(document, product, os_name):
+    for group in document["products"].get(product, []):
+        if group["os"] == os_name:
+            return group["data"]
+    return []
+
+
+def scan_latest(document, product, os_name, series):
+    """How a consumer answers "latest <series>" without an index: parse and compare every entry."""
+    prefix = v2tuple(series)
+    best = None
+    for entry in scan_group(document, product, os_name):
+        key = v2tuple(entry["version"])
+        if key[:len(prefix)] == prefix and (best is None or key > best[0]):
+            best = (key, entry)
+    return best[1] if best else None
+
+
+def scan_exact(document, product, os_name, version):
+    key = v2tuple(version)
+    for entry in scan_group(document, product, os_name):
+        if v2tuple(entry["version"]) == key:
+            return entry
+    return None
+
+
+def scan_range(document, product, os_name, min_version, max_version):
+    low = v2tuple(min_version)
+    high = v2tuple(max_version)
+    matches = [entry for entry in scan_group(document, product, os_name)
+               if low <= v2tuple(entry["version"]) and v2tuple(entry["version"])[:len(high)] <= high]
+    return utils.sort_versions(matches, key=lambda entry: entry["version"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--catalog", default=os.path.join(ROOT, catalog.ASSETS_DIR, catalog.CATALOG_FILE))
+    parser.add_argument("--number", type=int, default=2000, help="lookups per timing")
+    args = parser.parse_args(argv)
+
+    document = utils.load_catalog(args.catalog)
+    build = min(timeit.repeat(lambda: catalog.Catalog(document), number=1, repeat=5))
+    index = catalog.Catalog(document)
+    print(f"index build {build * 1000:.2f} ms for {len(index.products())} products")
+
+    queries = {
+        "latest mysql 8.0 Linux": (lambda: scan_latest(document, "mysql", "Linux", "8.0"),
+                                   lambda: index.latest("mysql", "Linux", "8.0")),
+        "exact nodejs 22.18.0 Linux": (lambda: scan_exact(document, "nodejs", "Linux", "22.18.0"),
+                                       lambda: index.exact("nodejs", "Linux", "22.18.0")),
+        "range nginx 1.24-1.26 Windows": (lambda: scan_range(document, "nginx", "Windows", "1.24", "1.26"),
+                                          lambda: index.range("nginx", "Windows", "1.24", "1.26")),
+    }
+    print(f"{'query':<32}{'scan us':>10}{'index us':>10}{'speedup':>9}")
+    for name, (scan, lookup) in queries.items():
+        assert scan() == lookup(), f"{name}: index and scan disagree"
+        scanned = min(timeit.repeat(scan, number=args.number, repeat=5)) / args.number
+        indexed = min(timeit.repeat(lookup, number=args.number, repeat=5)) / args.number
+        print(f"{name:<32}{scanned * 1e6:>10.2f}{indexed * 1e6:>10.2f}{scanned / indexed:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Time MySQL platform page parsing on threads against a pool of parsing processes.
+
+    python benchmarks/bench_mysql_pool.py                             # synthesized pages
+    python benchmarks/bench_mysql_pool.py --archive fixtures.json.gz  # pages of `entydata refresh --record`
+
+Each run parses the same batch of pages the way ``MysqlScrape.scrape_jobs``
+does: raw bytes in, ``PACKAGE_FIELDS`` tuples out. Threads share one GIL, so
+their throughput stays flat; processes should scale with the cores. Pool
+start-up is left out of the timings, it is paid once per scrape.
+"""
+import argparse
+import base64
+import concurrent.futures
+import os
+import sys
+import time
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bench_mysql_rows
+import mysql
+from transports import load_archive
+
+# Platform page "os" query parameter -> MysqlScrape OS key
+OS_KEYS = {str(number): key for key, number in mysql.MysqlScrape().os_handling.items()}
+
+
+def recorded_pages(path):
+    """Return ``(bytes, os key)`` of every platform page in a fixture archive."""
+    pages = []
+    for key, record in load_archive(path).items():
+        query = parse_qs(urlsplit(key.split(" ", 1)[1]).query)
+        if query.get("tpl") == ["platform"] and record["status"] == 200:
+            pages.append((base64.b64decode(record["body"]), OS_KEYS.get(query.get("os", [""])[0], "win")))
+    return pages
+
+
+def parse_all(executor, pages):
+    futures = [executor.submit(mysql.parse_platform_page, content, "utf-8", os_key) for content, os_key in pages]
+    return [future.result()[0] for future in futures]
+
+
+def timed(executor, pages, repeat):
+    # One untimed round so processes are started and have imported bs4
+    expected = parse_all(executor, pages)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        assert parse_all(executor, pages) == expected, "parsers disagree"
+        best = min(best, time.perf_counter() - start)
+    return best, expected
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--archive", help="fixture archive recorded with `entydata refresh --record`")
+    parser.add_argument("--pages", type=int, default=48, help="synthesized pages (default: 48)")
+    parser.add_argument("--threads", type=int, default=8, help="fetch threads of scrape_jobs (default: 8)")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1,
+                        help="largest parsing pool tried (default: one per CPU)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    if args.archive:
+        pages = recorded_pages(args.archive)
+        source = args.archive
+    else:
+        page = bench_mysql_rows.synthesize().encode("utf-8")
+        pages = [(page, "win")] * args.pages
+        source = "synthesized"
+    if not pages:
+        parser.error("no platform pages found")
+    print(f"{len(pages)} platform pages ({source}), {sum(len(content) for content, _ in pages) / 1024:.0f} KB, "
+          f"{os.cpu_count()} CPU(s)")
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=args.threads) as executor:
+        baseline, expected = timed(executor, pages, args.repeat)
+    print(f"{args.threads} threads      {baseline * 1000:>9.1f} ms  {len(pages) / baseline:>7.1f} pages/s")
+
+    sizes = sorted({args.max_workers} | {2 ** n for n in range(args.max_workers.bit_length()) if 2 ** n < args.max_workers})
+    for workers in sizes:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            elapsed, packages = timed(executor, pages, args.repeat)
+        assert packages == expected, "processes and threads disagree"
+        print(f"{workers:>2} process(es) {elapsed * 1000:>9.1f} ms  {len(pages) / elapsed:>7.1f} pages/s  "
+              f"({baseline / elapsed:.1f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
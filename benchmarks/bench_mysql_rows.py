@@ -0,0 +1,97 @@
+"""Time the single-pass MySQL platform table extraction against the previous row-by-row one.
+
+    python benchmarks/bench_mysql_rows.py                   # synthesized platform page
+    python benchmarks/bench_mysql_rows.py --page saved.html # a saved platform page
+
+Both extractors run on the same parsed table, so the numbers exclude HTML
+parsing, which ``bench_parse.py`` covers.
+"""
+import argparse
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mysql
+import utils
+
+# (package name, file suffix) of a Windows platform page, blocked and skipped packages included
+PACKAGES = (
+    ("Windows (x86, 64-bit), ZIP Archive", "winx64.zip"),
+    ("Windows (x86, 64-bit), ZIP Archive Debug Binaries & Test Suite", "winx64-debug-test.zip"),
+    ("Windows (x86, 64-bit), MSI Installer", "winx64.msi"),
+    ("Windows (x86, 32-bit), ZIP Archive", "win32.zip"),
+)
+
+
+def synthesize(versions=40):
+    rows = []
+    for minor in range(versions):
+        version = f"8.0.{minor}"
+        for name, suffix in PACKAGES:
+            file_name = f"mysql-{version}-{suffix}"
+            rows.append(
+                f'<tr><td class="col1">{name}</td><td class="col3">{version}</td><td class="col4">220.4M</td>'
+                f'<td class="col5"><a href="/archives/get/p/23/file/{file_name}">Download</a></td></tr>\n'
+                f'<tr><td class="col2 sub-text">({file_name})</td><td class="col5 sub-text">MD5: '
+                f'<code class="md5">{minor:032x}</code> | '
+                f'<a class="signature" href="/archives/gpg/?file={file_name}&amp;p=23">Signature</a></td></tr>'
+            )
+    return "<html><body><table class=\"table\">" + "\n".join(rows) + "</table></body></html>"
+
+
+def legacy_rows(table, target_os):
+    """The extraction loop as it was before the single-pass iterator."""
+    rows = [row for row in table.find_all("tr") if len(row.find_all("td")) == 4]
+    results = []
+    for row in rows:
+        td_element = row.find_all("td")
+        if any(block in td_element[0].text.lower() for block in mysql.MysqlScrape().block_list):
+            continue
+        url = td_element[3].find("a").get("href")
+        next_line = row.find_next_sibling().find_all("td")
+        file_name = re.sub(r"[()]", "", next_line[0].text)
+        if url.endswith((".msi", ".tar.gz", ".dmg")):
+            continue
+        md5 = next_line[1].find("code", {"class": "md5"}).text
+        gpg = next_line[1].find("a", {"class": "signature"}).get("href")
+        results.append({
+            "os": target_os,
+            "url": ("https://downloads.mysql.com" + url if url.startswith("/") else url),
+            "file_name": file_name,
+            "md5": md5,
+            "gpg": ("https://downloads.mysql.com" + gpg if gpg.startswith("/") else gpg),
+        })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--page", help="saved platform page (default: a synthesized page)")
+    parser.add_argument("--versions", type=int, default=40, help="versions in the synthesized page (default: 40)")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    if args.page:
+        with open(args.page, "r", encoding="utf-8") as f:
+            html = f.read()
+    else:
+        html = synthesize(args.versions)
+    table = utils.make_soup(html, mysql.PLATFORM_TABLE).find("table")
+
+    legacy = legacy_rows(table, "win")
+    fused = list(mysql.MysqlScrape.iter_packages(table, "win"))
+    assert legacy == fused, "extractors disagree"
+
+    before = min(timeit.repeat(lambda: legacy_rows(table, "win"), number=1, repeat=args.repeat))
+    after = min(timeit.repeat(lambda: list(mysql.MysqlScrape.iter_packages(table, "win")), number=1,
+                              repeat=args.repeat))
+    print(f"{len(table.find_all('tr'))} rows, {len(fused)} packages ({args.page or 'synthesized'})")
+    print(f"row-by-row  {before * 1000:>8.2f} ms")
+    print(f"single-pass {after * 1000:>8.2f} ms  ({before / after:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Time full-document ``html.parser`` parsing against ``utils.make_soup`` scoped parsing.
+
+    python benchmarks/bench_parse.py                            # pages of benchmarks/fixtures/upstream.json.gz
+    python benchmarks/bench_parse.py --archive fixtures.json.gz # pages of `entydata refresh --record`
+    python benchmarks/bench_parse.py --save                     # download the pages into the archive first
+
+The pages are read from a fixture archive, by default the committed one
+``check_replay.py`` refreshes from, so every page is timed on a fresh
+checkout. Its pages are trimmed stand-ins of the upstream ones; ``--save``
+records the live pages into the archive for timings on full-size pages.
+"""
+import argparse
+import base64
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from bs4 import BeautifulSoup
+
+import apache
+import composer
+import heldisql
+import mysql
+import php
+import utils
+from transports import load_archive
+
+ARCHIVE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "upstream.json.gz")
+
+# fixture name -> (upstream url, strainer the scraper parses it with)
+PAGES = {
+    "mysql_archive": ("https://downloads.mysql.com/archives/community/", None),
+    "mysql_platform": ("https://downloads.mysql.com/archives/community/?tpl=platform&os=3&version=8.0.34",
+                       mysql.PLATFORM_TABLE),
+    "apache_changelog": ("https://www.apachelounge.com/Changelog-2.4.html", apache.CHANGELOG_HEADINGS),
+    "php": ("https://windows.php.net/download/", php.RELEASE_BLOCKS),
+    "composer": ("https://getcomposer.org/download/", composer.RELEASE_TABLE),
+    "heidisql": ("https://www.heidisql.com/download.php#", heldisql.OLD_RELEASES),
+}
+
+
+def save_pages(archive):
+    """Download the pages and record them into ``archive``, next to what it already holds."""
+    with utils.make_client(record=archive) as client:
+        for name, (url, _) in PAGES.items():
+            response = client.get(url, headers={"User-Agent": "Mozilla/5.0"})
+            response.raise_for_status()
+            print(f"Saved {name} ({len(response.content)} bytes)")
+
+
+def recorded_pages(archive):
+    """Return ``{page name: text}`` of the ``PAGES`` found in a fixture archive."""
+    records = load_archive(archive)
+    pages = {}
+    for name, (url, _) in PAGES.items():
+        record = records.get(f"GET {url}")
+        if record is not None and record["status"] == 200:
+            # Decoded like the scrapers see it: content coding and charset from the recorded headers
+            pages[name] = httpx.Response(200, headers=record["headers"], content=base64.b64decode(record["body"])).text
+    return pages
+
+
+def bench(archive, repeat):
+    pages = recorded_pages(archive)
+    print(f"make_soup parser: {utils.html_parser()}")
+    print(f"{'page':<22} {'KB':>7} {'html.parser ms':>15} {'make_soup ms':>13} {'speedup':>8}")
+    for name, (_, strainer) in PAGES.items():
+        html = pages.get(name)
+        if html is None:
+            print(f"{name:<22} not in {archive}, run with --save")
+            continue
+        full = min(timeit.repeat(lambda: BeautifulSoup(html, "html.parser"), number=1, repeat=repeat))
+        scoped = min(timeit.repeat(lambda: utils.make_soup(html, strainer), number=1, repeat=repeat))
+        print(f"{name:<22} {len(html) / 1024:>7.1f} {full * 1000:>15.2f} {scoped * 1000:>13.2f} {full / scoped:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--save", action="store_true", help="record the live upstream pages into the archive first")
+    parser.add_argument("--archive", default=ARCHIVE,
+                        help="fixture archive (default: benchmarks/fixtures/upstream.json.gz)")
+    parser.add_argument("--repeat", type=int, default=5, help="timing repetitions, best one is reported")
+    args = parser.parse_args()
+    if args.save:
+        save_pages(args.archive)
+    bench(args.archive, args.repeat)
@@ -0,0 +1,138 @@
+"""Time each scraper's fetch, parse, transform and serialize phases on a recorded run.
+
+    python -m entydata refresh --record benchmarks/fixtures/upstream.json.gz   # once, online
+    python benchmarks/bench_scrapers.py                                        # offline, repeatable
+    python benchmarks/bench_scrapers.py --compare                              # fail on regressions
+
+Every run is appended to benchmarks/results.jsonl with the current git commit,
+so ``--compare`` can check the numbers against the last run of another commit.
+
+Phases: ``fetch`` is time spent waiting on the (replayed) transport, ``parse``
+is HTML/JSON parsing, ``transform`` is the rest of the scraper (filtering,
+sorting, building records) and ``serialize`` is the ``json.dumps`` of the asset.
+Phases are summed over threads, so for thread-pooled scrapers such as MySQL
+fetch and parse can add up to more than the wall-clock total.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import entydata
+import metrics
+import utils
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ARCHIVE = os.path.join(BENCH_DIR, "fixtures", "upstream.json.gz")
+RESULTS = os.path.join(BENCH_DIR, "results.jsonl")
+PHASES = ("fetch", "parse", "transform", "serialize")
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=BENCH_DIR).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_once(name, archive):
+    """Run one scraper against the archive and return its phase timings in seconds."""
+    utils.set_shared_client(utils.make_client(replay=archive))
+    try:
+        with metrics.recording() as recorder:
+            start = time.perf_counter()
+            data = entydata.run_scraper(name)
+            scraped = time.perf_counter()
+            with metrics.phase("serialize"):
+                json.dumps(data, indent=2, ensure_ascii=False)
+            total = time.perf_counter() - start
+    finally:
+        utils.close_shared_client()
+    timings = {phase: recorder.totals.get(phase, 0.0) for phase in ("fetch", "parse", "serialize")}
+    timings["transform"] = max(scraped - start - timings["fetch"] - timings["parse"], 0.0)
+    timings["total"] = total
+    return timings
+
+
+def peak_memory(name, archive):
+    """Return the peak traced memory (bytes) of one run, measured apart from the timings."""
+    tracemalloc.start()
+    try:
+        run_once(name, archive)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench(names, archive, repeat):
+    results = {}
+    for name in names:
+        runs = [run_once(name, archive) for _ in range(repeat)]
+        best = min(runs, key=lambda timings: timings["total"])
+        best["peak_kb"] = peak_memory(name, archive) / 1024
+        results[name] = best
+    return results
+
+
+def last_results(path, commit):
+    """Return the most recent results recorded for a commit other than ``commit``."""
+    previous = None
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                if record["commit"] != commit:
+                    previous = record
+    return previous
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("products", nargs="*", help=f"products to run (default: all of {', '.join(entydata.SCRAPERS)})")
+    parser.add_argument("--replay", default=ARCHIVE, help="fixture archive recorded with 'entydata refresh --record'")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per product, the fastest one is reported")
+    parser.add_argument("--results", default=RESULTS, help="JSON lines file results are appended to")
+    parser.add_argument("--compare", action="store_true", help="exit 1 if a product got slower than --threshold")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown for --compare (default: 0.2)")
+    args = parser.parse_args(argv)
+    if not os.path.exists(args.replay):
+        parser.error(f"{args.replay} not found, record one with: python -m entydata refresh --record {args.replay}")
+
+    names = args.products or list(entydata.SCRAPERS)
+    commit = git_commit()
+    results = bench(names, args.replay, args.repeat)
+
+    print(f"{'product':<12}" + "".join(f"{phase + ' ms':>14}" for phase in PHASES + ("total",)) + f"{'peak KB':>10}")
+    for name, timings in results.items():
+        print(f"{name:<12}" + "".join(f"{timings[phase] * 1000:>14.2f}" for phase in PHASES + ("total",))
+              + f"{timings['peak_kb']:>10.0f}")
+
+    previous = last_results(args.results, commit)
+    with open(args.results, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"commit": commit, "time": time.time(), "results": results}) + "\n")
+
+    regressions = []
+    if previous is not None:
+        print(f"\nCompared to {previous['commit']}:")
+        for name, timings in results.items():
+            before = previous["results"].get(name)
+            if not before or not before["total"]:
+                continue
+            change = timings["total"] / before["total"] - 1
+            print(f"{name:<12}{change:>+14.1%}")
+            if change > args.threshold:
+                regressions.append(name)
+    if args.compare and regressions:
+        print(f"Slower than {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
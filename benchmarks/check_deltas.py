@@ -0,0 +1,119 @@
+"""Check that catalog deltas patch a client's copy into exactly the server's catalog.
+
+    python benchmarks/check_deltas.py    # exits 1 on a mismatch
+
+Each case changes a small catalog the way a refresh can (a signature or
+checksum changing on one of several entries of a version, a link flagged
+dead, versions, OS groups and products coming and going) and checks that
+``utils.apply_delta`` of the delta gives a catalog whose ``content_hash`` is
+the delta's ``hash``. The cases are then applied one after the other as
+consecutive revisions, and the delta ``catalog.delta_since`` combines from
+every revision is checked the same way.
+"""
+import copy
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import catalog
+import utils
+
+
+def entry(version, arch, **fields):
+    return {"version": version, "link": f"https://www.apachelounge.com/download/httpd-{version}-{arch}.zip",
+            "gpg": "", **fields}
+
+
+BASE = {
+    "apache": [
+        {"os": "Windows", "data": [entry("2.4.65", "win64"), entry("2.4.65", "win32"),
+                                   entry("2.4.64", "win64"), entry("2.4.64", "win32")]},
+        {"os": "Linux", "data": [entry("2.4.65", "src"), entry("2.4.64", "src")]},
+    ],
+    "nginx": [{"os": "Linux", "data": [entry("1.28.0", "src"), entry("1.26.3", "src")]}],
+}
+
+
+def change_gpg(products):
+    products["apache"][0]["data"][0]["gpg"] = "https://www.apachelounge.com/download/httpd-2.4.65-win64.zip.asc"
+
+
+def flag_dead(products):
+    products["apache"][0]["data"][0]["dead"] = True
+
+
+def add_checksum(products):
+    products["apache"][0]["data"][1]["checksum"] = "sha256:" + "0" * 64
+
+
+def new_version(products):
+    products["apache"][0]["data"][:0] = [entry("2.4.66", "win64"), entry("2.4.66", "win32")]
+
+
+def drop_entry(products):
+    del products["apache"][0]["data"][-1]
+
+
+def swap_same_version(products):
+    data = products["apache"][0]["data"]
+    data[0], data[1] = data[1], data[0]
+
+
+def new_group(products):
+    products["nginx"].insert(0, {"os": "Windows", "data": [entry("1.28.0", "win64")]})
+
+
+def reorder_groups(products):
+    products["apache"].reverse()
+
+
+def drop_group(products):
+    products["nginx"] = [group for group in products["nginx"] if group["os"] != "Windows"]
+
+
+def new_product(products):
+    products["php"] = [{"os": "Windows", "data": [entry("8.4.10", "x64")]}]
+
+
+def drop_product(products):
+    del products["nginx"]
+
+
+CASES = (change_gpg, flag_dead, add_checksum, new_version, drop_entry, swap_same_version, new_group,
+         reorder_groups, drop_group, new_product, drop_product)
+
+
+def patched_hash(old, new, delta):
+    """Return the content hash of ``old`` patched with ``delta``, as a client would compute it."""
+    document = utils.apply_delta(old, delta)
+    return catalog.content_hash(document["products"])
+
+
+def main():
+    failed = 0
+    documents = [catalog.build_catalog(copy.deepcopy(BASE), 1)]
+    deltas = []
+    for case in CASES:
+        old = documents[-1]
+        products = copy.deepcopy(old["products"])
+        case(products)
+        new = catalog.build_catalog(products, old["revision"] + 1)
+        delta = catalog.diff_products(old["products"], products, old["revision"], new["revision"])
+        ok = patched_hash(old, new, delta) == delta["hash"] == new["hash"]
+        failed += not ok
+        print(f"[{' OK ' if ok else 'FAIL'}] {case.__name__}")
+        documents.append(new)
+        deltas.append(delta)
+
+    newest = documents[-1]
+    for old in documents[:-1]:
+        delta = catalog.delta_since(deltas, old["revision"])
+        ok = delta is not None and patched_hash(old, newest, delta) == newest["hash"]
+        failed += not ok
+        print(f"[{' OK ' if ok else 'FAIL'}] since revision {old['revision']}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""Guard the command line startup: listing products must not import the scraping stack.
+
+    python benchmarks/check_importtime.py                 # exits 1 on a regression
+    python benchmarks/check_importtime.py --budget-ms 60
+
+Each case runs in a fresh interpreter under ``python -X importtime`` and fails
+when one of the heavy dependencies shows up in the import log, or when the
+cumulative import time of the case's top module exceeds the budget. The
+``-X importtime`` bookkeeping itself costs a little, so the budget is looser
+than the startup measured at the end.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Only loaded once a scraper that needs them actually runs
+HEAVY = ("httpx", "httpcore", "h2", "bs4", "lxml", "tqdm", "asyncio")
+
+# name -> (code run in the fresh interpreter, module whose cumulative import time is checked)
+CASES = {
+    "import entydata": ("import entydata", "entydata"),
+    "entydata list": ("import sys, entydata; sys.argv[1:] = ['list']; entydata.main()", "entydata"),
+    # importlib.import_module is not logged by -X importtime, hence the explicit import
+    "phpmyadmin scraper": ("import registry, phpmyadmin; registry.run('phpmyadmin')", "phpmyadmin"),
+}
+
+
+def import_log(code):
+    """Run ``code`` under ``-X importtime`` and return ``{module: cumulative microseconds}``."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = int(cumulative)
+    return modules
+
+
+def startup(argv, repeat):
+    """Best wall time of ``python <argv>`` over ``repeat`` runs, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *argv], cwd=ROOT, capture_output=True, check=True)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=100.0,
+                        help="cumulative import time allowed per case (default: 100)")
+    parser.add_argument("--repeat", type=int, default=5, help="runs of each startup measurement (default: 5)")
+    args = parser.parse_args(argv)
+
+    failed = 0
+    for case, (code, module) in CASES.items():
+        modules = import_log(code)
+        heavy = [name for name in modules if name.split(".")[0] in HEAVY]
+        elapsed = modules.get(module, 0) / 1000
+        if heavy:
+            failed += 1
+            print(f"[FAIL] {case}: imports {', '.join(sorted({name.split('.')[0] for name in heavy}))}")
+        elif elapsed > args.budget_ms:
+            failed += 1
+            print(f"[FAIL] {case}: {module} took {elapsed:.1f} ms to import (budget {args.budget_ms:.0f} ms)")
+        else:
+            print(f"[ OK ] {case}: {module} {elapsed:.1f} ms, {len(modules)} modules")
+
+    bare = startup(["-c", "pass"], args.repeat)
+    listing = startup(["-m", "entydata", "list"], args.repeat)
+    print(f"python -c pass           {bare * 1000:>7.1f} ms")
+    print(f"python -m entydata list  {listing * 1000:>7.1f} ms  (+{(listing - bare) * 1000:.1f} ms)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+"""Smoke-test a whole refresh against the recorded upstream archive, without any network.
+
+    python benchmarks/check_replay.py                                  # exits 1 on a failure
+    python benchmarks/check_replay.py --archive fixtures.json.gz       # another `entydata refresh --record` archive
+
+Runs ``python -m entydata refresh --replay`` in a fresh interpreter into a
+temporary assets directory and fails when the command fails, when a product's
+file is missing or empty, or when ``catalog.json`` does not hold every product.
+A request the archive has no answer for fails like an unreachable host, so a
+scraper that starts fetching a new page shows up here until the archive is
+recorded again.
+
+``fixtures/upstream.json.gz`` is a trimmed archive: it was recorded with
+``--record`` against stand-in pages shaped like the upstream ones, not live.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import catalog
+import registry
+
+ARCHIVE = os.path.join(ROOT, "benchmarks", "fixtures", "upstream.json.gz")
+
+
+def check(assets_dir, names):
+    """Return the problems found in the files a refresh of ``names`` wrote to ``assets_dir``."""
+    problems = []
+    for name in names:
+        path = os.path.join(assets_dir, registry.SCRAPERS[name].output)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            problems.append(f"{name}: {e}")
+            continue
+        if not any(group.get("data") for groups in data.values() for group in groups):
+            problems.append(f"{name}: no releases in {path}")
+    try:
+        with open(os.path.join(assets_dir, catalog.CATALOG_FILE), "r", encoding="utf-8") as f:
+            products = json.load(f)["products"]
+    except (OSError, ValueError, KeyError) as e:
+        problems.append(f"catalog: {e}")
+    else:
+        missing = [name for name in names if name not in products]
+        if missing:
+            problems.append(f"catalog: no {', '.join(missing)}")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--archive", default=ARCHIVE, help="fixture archive (default: benchmarks/fixtures/upstream.json.gz)")
+    parser.add_argument("products", nargs="*", metavar="product", help="products to refresh (default: all)")
+    args = parser.parse_args(argv)
+    names = args.products or registry.names()
+
+    with tempfile.TemporaryDirectory() as assets_dir:
+        result = subprocess.run([sys.executable, "-m", "entydata", "refresh", *names, "--replay", args.archive,
+                                 "--assets-dir", assets_dir], cwd=ROOT, capture_output=True, text=True)
+        problems = [f"refresh exited with {result.returncode}:\n{result.stderr}"] if result.returncode else []
+        problems += check(assets_dir, names)
+
+    for problem in problems:
+        print(f"[FAIL] {problem}")
+    if not problems:
+        print(f"[ OK ] {len(names)} products refreshed from {os.path.relpath(args.archive, ROOT)}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
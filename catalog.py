@@ -0,0 +1,485 @@
+"""Write the assets: one merged catalog plus a shard per product, and query it with ``Catalog``.
+
+``assets/catalog.json`` holds every product, so a consumer loads one file;
+``assets/<product>.json`` shards keep the per-product files working. Every
+file is written to a temporary file and renamed over the old one, so readers
+see either the previous or the new content, never half of it, and files
+whose content did not change are not rewritten at all.
+
+Next to ``catalog.json`` the same catalog is written in compact variants for
+clients: ``catalog.min.json`` (no whitespace), ``catalog.packed.json`` (see
+``pack_catalog``) and, when ``msgpack`` is installed, ``catalog.msgpack``
+holding the packed form. ``utils.load_catalog`` reads any of them.
+
+Every catalog whose products change gets the next ``revision``, and the
+change is kept as a delta in ``catalog.deltas.json`` for the last
+``MAX_DELTAS`` revisions, so a client holding revision N can fetch only what
+changed since (``delta_since``) and patch its copy (``utils.apply_delta``).
+"""
+import bisect
+import hashlib
+import json
+import os
+import time
+
+from utils import PACKED_FORMAT, VERSION_PLACEHOLDER, VersionHandling, load_catalog
+
+ASSETS_DIR = "assets"
+CATALOG_FILE = "catalog.json"
+# Compact forms written next to catalog.json by write_variants
+VARIANT_SUFFIXES = (".min.json", ".packed.json", ".msgpack")
+# Bumped whenever the layout of catalog.json changes
+SCHEMA = 2
+# Consecutive deltas kept in catalog.deltas.json; clients further behind need the whole catalog
+MAX_DELTAS = 32
+# Fields stored as templates, e.g. "https://nginx.org/download/nginx-{version}.zip"
+TEMPLATED_FIELDS = ("link", "gpg")
+
+
+def dumps(data):
+    """Encode asset data the way the asset files are written."""
+    return json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+
+
+def content_hash(data):
+    """Return the SHA-256 of the canonical JSON encoding of ``data``."""
+    canonical = json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def write_atomic(path, payload):
+    """Write ``payload`` bytes to ``path`` through a temporary file in the same directory."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def write_if_changed(path, payload):
+    """Atomically write ``payload`` unless ``path`` already holds exactly it. Returns True if written."""
+    try:
+        with open(path, "rb") as f:
+            if hashlib.sha256(f.read()).digest() == hashlib.sha256(payload).digest():
+                return False
+    except OSError:
+        pass
+    write_atomic(path, payload)
+    return True
+
+
+def write_json(path, data):
+    """Atomically write asset data to ``path`` unless it is unchanged. Returns True if written."""
+    return write_if_changed(path, dumps(data))
+
+
+def read_catalog(path):
+    """Return the catalog saved at ``path``, or None if there is none."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def build_catalog(products, revision=1):
+    """Wrap ``{product: [groups]}`` into the catalog document."""
+    products = dict(sorted(products.items()))
+    return {
+        "schema": SCHEMA,
+        "revision": revision,
+        "hash": content_hash(products),
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "products": products,
+    }
+
+
+def pack_catalog(document):
+    """
+    Dictionary-encode a catalog document into the packed layout.
+
+    Every distinct string is stored once in a top-level ``strings`` table and
+    referred to by index. Each product lists its distinct entries column by
+    column (``columns``: field -> string index or null when absent; fields
+    with non-string values go to ``raw`` as they are), and each OS group is a
+    list of entry numbers, so an entry shared by several OSes is stored once.
+    Links and signatures are stored as templates with the entry's version
+    replaced by ``VERSION_PLACEHOLDER``, which makes the links of all
+    versions of a file the same string.
+    """
+    strings = []
+    index = {}
+
+    def ref(value):
+        position = index.get(value)
+        if position is None:
+            position = index[value] = len(strings)
+            strings.append(value)
+        return position
+
+    products = {}
+    for name, groups in document["products"].items():
+        entries = []
+        numbers = {}
+        group_rows = []
+        for group in groups:
+            rows = []
+            for entry in group["data"]:
+                key = tuple(entry.items())
+                if key not in numbers:
+                    numbers[key] = len(entries)
+                    entries.append(entry)
+                rows.append(numbers[key])
+            group_rows.append(rows)
+
+        fields = list(dict.fromkeys(field for entry in entries for field in entry))
+        columns = {}
+        raw = {}
+        templates = []
+        for field in fields:
+            values = [entry.get(field) for entry in entries]
+            if not all(value is None or isinstance(value, str) for value in values):
+                raw[field] = values
+                continue
+            if field in TEMPLATED_FIELDS and not any(value and VERSION_PLACEHOLDER in value for value in values):
+                templates.append(field)
+                values = [value if value is None or not entry.get("version")
+                          else value.replace(entry["version"], VERSION_PLACEHOLDER)
+                          for value, entry in zip(values, entries)]
+            columns[field] = [None if value is None else ref(value) for value in values]
+        products[name] = {
+            "os": [ref(group["os"]) for group in groups],
+            "groups": group_rows,
+            "count": len(entries),
+            "fields": fields,
+            "columns": columns,
+            "raw": raw,
+            "templates": templates,
+        }
+    return {
+        "format": PACKED_FORMAT,
+        "schema": document["schema"],
+        "revision": document.get("revision"),
+        "hash": document["hash"],
+        "generated_at": document["generated_at"],
+        "strings": strings,
+        "products": products,
+    }
+
+
+def variant_path(path, suffix):
+    """Return the path of a catalog variant, e.g. ``catalog.min.json`` for suffix ``.min.json``."""
+    root, _ = os.path.splitext(path)
+    return root + suffix
+
+
+def base_path(path):
+    """Return the path of the ``catalog.json`` a variant was written from, or ``path`` itself."""
+    for suffix in VARIANT_SUFFIXES:
+        if path.endswith(suffix):
+            return path[:-len(suffix)] + ".json"
+    return path
+
+
+def write_variants(document, path):
+    """Write the minified, packed and (if ``msgpack`` is installed) msgpack variants of a catalog."""
+    write_if_changed(variant_path(path, ".min.json"),
+                     json.dumps(document, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+    packed = pack_catalog(document)
+    write_if_changed(variant_path(path, ".packed.json"),
+                     json.dumps(packed, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+    try:
+        import msgpack
+    except ImportError:
+        return
+    write_if_changed(variant_path(path, ".msgpack"), msgpack.packb(packed, use_bin_type=True))
+
+
+def entry_key(product, os_name, entry):
+    """Identify an entry across revisions by ``(product, os, version, link)``."""
+    return product, os_name, entry.get("version"), entry.get("link")
+
+
+def _entries(products):
+    entries = {}
+    for product, groups in products.items():
+        for group in groups:
+            for entry in group["data"]:
+                entries.setdefault(entry_key(product, group["os"], entry), entry)
+    return entries
+
+
+def _group_keys(data):
+    return [[entry.get("version"), entry.get("link")] for entry in data]
+
+
+def diff_products(old, new, from_revision, to_revision):
+    """
+    Return the delta turning the ``old`` products into the ``new`` ones.
+
+    ``removed`` lists the ``[product, os, version, link]`` keys that are gone,
+    ``added`` the ``[product, os, entry]`` entries that are new, ``hash`` is
+    the content hash of ``new``. An entry whose other fields (signature,
+    checksum, ...) changed is both removed and added; clients apply the
+    removals first. ``order`` holds the ``[product, os, [[version, link],
+    ...]]`` order of every OS group that changed, and ``groups`` the
+    ``[product, [os, ...]]`` order of the groups of every product whose groups
+    changed (``None`` for a product that is gone), so the patched catalog
+    comes out in the same order, with the same hash.
+    """
+    old_entries = _entries(old)
+    new_entries = _entries(new)
+    removed = [list(key) for key, entry in old_entries.items() if new_entries.get(key) != entry]
+    added = [[key[0], key[1], entry] for key, entry in new_entries.items() if old_entries.get(key) != entry]
+    order = []
+    for product, groups in new.items():
+        old_groups = {group["os"]: group["data"] for group in old.get(product, [])}
+        for group in groups:
+            if old_groups.get(group["os"]) != group["data"]:
+                order.append([product, group["os"], _group_keys(group["data"])])
+    groups = []
+    for product in sorted(old.keys() | new.keys()):
+        os_names = [group["os"] for group in new[product]] if product in new else None
+        if product not in old or os_names != [group["os"] for group in old[product]]:
+            groups.append([product, os_names])
+    return {"from": from_revision, "to": to_revision, "hash": content_hash(new), "added": added, "removed": removed,
+            "order": order, "groups": groups}
+
+
+def delta_since(deltas, since):
+    """
+    Combine the consecutive ``deltas`` (oldest first) into one delta from revision ``since``.
+
+    Returns None when the deltas do not reach back to ``since`` (or past the
+    newest revision), in which case the client needs the whole catalog.
+    """
+    if not deltas:
+        return None
+    newest = deltas[-1]["to"]
+    if since == newest:
+        return {"from": since, "to": newest, "hash": deltas[-1].get("hash"), "added": [], "removed": [],
+                "order": [], "groups": []}
+    chain = [delta for delta in deltas if delta["from"] >= since]
+    if not chain or chain[0]["from"] != since or any(a["to"] != b["from"] for a, b in zip(chain, chain[1:])):
+        return None
+    removed = {}
+    added = {}
+    # The order a group or product was left in by the last delta that changed it
+    order = {}
+    groups = {}
+    for delta in chain:
+        for key in delta["removed"]:
+            key = tuple(key)
+            # An entry added after ``since`` and removed again never reaches the client
+            if added.pop(key, None) is None:
+                removed[key] = None
+        for product, os_name, entry in delta["added"]:
+            added[entry_key(product, os_name, entry)] = [product, os_name, entry]
+        for product, os_name, keys in delta.get("order", ()):
+            order[(product, os_name)] = keys
+        for product, os_names in delta.get("groups", ()):
+            groups[product] = os_names
+            # Groups gone since need no order any more
+            for key in [key for key in order if key[0] == product and key[1] not in (os_names or ())]:
+                del order[key]
+    combined = {"from": since, "to": newest, "hash": deltas[-1].get("hash"), "added": list(added.values()),
+                "removed": [list(key) for key in removed]}
+    # Deltas saved before the order was kept leave clients to sort by version
+    if all("order" in delta for delta in chain):
+        combined["order"] = [[product, os_name, keys] for (product, os_name), keys in order.items()]
+        combined["groups"] = [[product, os_names] for product, os_names in groups.items()]
+    return combined
+
+
+def read_deltas(path):
+    """
+    Return the deltas saved next to the catalog at ``path``, oldest first, or an empty list.
+
+    ``path`` may also be one of the catalog's variants, which share its deltas.
+    """
+    document = read_catalog(variant_path(base_path(path), ".deltas.json"))
+    return document["deltas"] if document and document.get("deltas") else []
+
+
+def write_deltas(path, deltas, revision):
+    """Save the last ``MAX_DELTAS`` deltas next to the catalog at ``path`` (now at ``revision``)."""
+    document = {"revision": revision, "deltas": deltas[-MAX_DELTAS:]}
+    write_if_changed(variant_path(path, ".deltas.json"),
+                     json.dumps(document, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+
+
+def write_catalog(products, path):
+    """
+    Write the catalog of ``products`` to ``path``, unless it holds the same products already.
+
+    The comparison uses the content hash stored in the catalog, so an
+    unchanged refresh leaves the file (and its ``generated_at``) untouched.
+    Changed products get the next revision and their delta is saved before
+    the catalog itself, so whoever sees the new catalog finds its delta too.
+    The compact variants are brought in line with whichever catalog ends up
+    on disk. Returns True if ``path`` was written.
+    """
+    document = read_catalog(path)
+    written = False
+    changed = document is None or document.get("hash") != content_hash(products)
+    if changed or document.get("schema") != SCHEMA:
+        revision = (document or {}).get("revision") or 0
+        if changed and revision:
+            delta = diff_products(document["products"], products, revision, revision + 1)
+            write_deltas(path, read_deltas(path) + [delta], revision + 1)
+        elif changed:
+            # No earlier revision to start a delta from
+            write_deltas(path, [], revision + 1)
+        document = build_catalog(products, revision + 1 if changed else max(revision, 1))
+        write_atomic(path, dumps(document))
+        written = True
+    write_variants(document, path)
+    return written
+
+
+def shard_files():
+    """Return ``{product: shard file name}`` of every scraper."""
+    import registry
+
+    return {name: spec.output for name, spec in registry.SCRAPERS.items()}
+
+
+def update_catalog(updates, assets_dir=ASSETS_DIR):
+    """
+    Merge freshly scraped ``{product: [groups]}`` into the catalog of ``assets_dir``.
+
+    Products not in ``updates`` keep their catalog entry, or are taken from
+    their shard when the catalog does not have them yet. Returns the catalog
+    path and whether it was written.
+    """
+    path = os.path.join(assets_dir, CATALOG_FILE)
+    previous = (read_catalog(path) or {}).get("products", {})
+    products = {}
+    for name, filename in shard_files().items():
+        if name in updates:
+            products[name] = updates[name]
+        elif name in previous:
+            products[name] = previous[name]
+        else:
+            try:
+                with open(os.path.join(assets_dir, filename), "r", encoding="utf-8") as f:
+                    products.update(json.load(f))
+            except (OSError, ValueError):
+                continue
+    for name, groups in updates.items():
+        products.setdefault(name, groups)
+    return path, write_catalog(products, path)
+
+
+def publish(data, filename, assets_dir=ASSETS_DIR):
+    """Write one scraper's ``{product: [groups]}`` data as its shard and merge it into the catalog."""
+    path = os.path.join(assets_dir, filename)
+    write_json(path, data)
+    update_catalog(data, assets_dir)
+    return path
+
+
+def _series_end(prefix):
+    """Return the smallest version tuple above every version starting with ``prefix``."""
+    return prefix[:-1] + (prefix[-1] + 1,)
+
+
+class Catalog:
+    """
+    Read-only catalog with a sorted index per (product, OS), queried by bisection.
+
+    Each OS group's entries are kept sorted by version tuple, so exact,
+    latest-in-series and range lookups cost O(log n) plus the size of the
+    answer. A version listed more than once (e.g. a win64 and a win32
+    download) keeps the order of the assets, so the first entry is the
+    preferred download.
+
+        catalog = Catalog.load()
+        catalog.latest("mysql", "Linux", "8.0")
+        catalog.range("nginx", "Windows", "1.24", "1.26")
+    """
+
+    def __init__(self, document):
+        self.document = document
+        # (product, OS) -> (ascending version tuples, entries in the same order)
+        self._index = {}
+        v2tuple = VersionHandling.v2tuple
+        for product, groups in document["products"].items():
+            for group in groups:
+                pairs = sorted(((v2tuple(entry["version"]), entry) for entry in group["data"]),
+                               key=lambda pair: pair[0])
+                self._index[(product, group["os"])] = ([key for key, _ in pairs], [entry for _, entry in pairs])
+
+    @classmethod
+    def load(cls, path=os.path.join(ASSETS_DIR, CATALOG_FILE)):
+        """Load a catalog in any format ``utils.load_catalog`` reads."""
+        return cls(load_catalog(path))
+
+    def products(self):
+        return list(self.document["products"])
+
+    def os_names(self, product):
+        return [group["os"] for group in self.document["products"].get(product, [])]
+
+    def _lookup(self, product, os_name):
+        return self._index.get((product, os_name), ([], []))
+
+    @staticmethod
+    def _descending(keys, entries, lo, hi):
+        # Newest version first, entries of the same version in asset order
+        result = []
+        end = hi
+        while end > lo:
+            start = bisect.bisect_left(keys, keys[end - 1], lo, end)
+            result.extend(entries[start:end])
+            end = start
+        return result
+
+    def exact(self, product, os_name, version):
+        """Return the (first) entry of exactly ``version``, or None."""
+        keys, entries = self._lookup(product, os_name)
+        key = VersionHandling.v2tuple(version)
+        i = bisect.bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            return entries[i]
+        return None
+
+    def latest(self, product, os_name, series=None):
+        """
+        Return the (first) entry of the newest version, or None.
+
+        ``series`` restricts it to versions starting with the given components,
+        e.g. "8.0" for the newest 8.0.x or "8" for the newest 8.x; a series
+        without any version component (e.g. "foo") matches nothing.
+        """
+        keys, entries = self._lookup(product, os_name)
+        prefix = VersionHandling.v2tuple(series) if series is not None else ()
+        if series is not None and not prefix:
+            return None
+        lo = bisect.bisect_left(keys, prefix)
+        hi = bisect.bisect_left(keys, _series_end(prefix)) if prefix else len(keys)
+        if hi <= lo:
+            return None
+        return entries[bisect.bisect_left(keys, keys[hi - 1], lo, hi)]
+
+    def range(self, product, os_name, min_version=None, max_version=None):
+        """
+        Return the entries from ``min_version`` up to ``max_version``, newest first.
+
+        Both bounds are inclusive series: ``range(..., "1.24", "1.26")`` covers
+        1.24.0 through every 1.26.x.
+        """
+        keys, entries = self._lookup(product, os_name)
+        lo = bisect.bisect_left(keys, VersionHandling.v2tuple(min_version)) if min_version else 0
+        high = VersionHandling.v2tuple(max_version) if max_version else ()
+        hi = bisect.bisect_left(keys, _series_end(high)) if high else len(keys)
+        return self._descending(keys, entries, lo, hi)
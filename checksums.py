@@ -0,0 +1,132 @@
+"""Verify the checksums stored in the assets against the files they link to.
+
+    python checksums.py                          # every product with checksums
+    python checksums.py nodejs composer --workers 8
+
+Downloads are streamed in chunks and hashed as they arrive, each one in a
+worker process, so whole archives are never held in memory and hashing
+does not compete with the other downloads for one interpreter.
+"""
+import argparse
+import concurrent.futures
+import hashlib
+import json
+import os
+import sys
+
+import httpx
+
+CHUNK_SIZE = 1024 * 1024
+
+# The client of a worker process, created by _init_worker
+_client = None
+
+
+def parse_checksum(value):
+    """Split an ``"<algorithm>:<hex digest>"`` checksum, raising ValueError for unknown algorithms."""
+    algorithm, _, digest = value.partition(":")
+    if not digest or algorithm not in hashlib.algorithms_available:
+        raise ValueError(f"Unsupported checksum: {value!r}")
+    return algorithm, digest.lower()
+
+
+def iter_checksummed(data):
+    """Yield ``(product, link, checksum)`` for every entry of asset data with a checksum, each link once."""
+    seen = set()
+    for product, groups in data.items():
+        for group in groups:
+            for entry in group["data"]:
+                link = entry.get("link")
+                if entry.get("checksum") and link and link not in seen:
+                    seen.add(link)
+                    yield product, link, entry["checksum"]
+
+
+def _init_worker(timeout):
+    global _client
+    import utils
+
+    _client = utils.make_client(timeout=timeout)
+
+
+def hash_download(url, algorithm, chunk_size=CHUNK_SIZE):
+    """Stream ``url`` and return the hex digest of its body, reading ``chunk_size`` bytes at a time."""
+    digest = hashlib.new(algorithm)
+    with _client.stream("GET", url, follow_redirects=True) as response:
+        response.raise_for_status()
+        for chunk in response.iter_bytes(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _hash_job(url, algorithm, chunk_size):
+    # httpx errors do not survive pickling back to the parent, so only their message is returned
+    try:
+        return hash_download(url, algorithm, chunk_size), None
+    except httpx.HTTPError as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def verify(items, workers=4, chunk_size=CHUNK_SIZE, timeout=60.0):
+    """
+    Hash the downloads of ``(product, link, checksum)`` items on a process pool.
+
+    Yields ``(product, link, checksum, actual, error)`` as each download
+    finishes; ``actual`` is the hex digest, or None when ``error`` says why
+    the file could not be hashed.
+    """
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                                initargs=(timeout,)) as executor:
+        futures = {}
+        for product, link, checksum in items:
+            try:
+                algorithm, _ = parse_checksum(checksum)
+            except ValueError as e:
+                yield product, link, checksum, None, str(e)
+                continue
+            futures[executor.submit(_hash_job, link, algorithm, chunk_size)] = (product, link, checksum)
+        for future in concurrent.futures.as_completed(futures):
+            product, link, checksum = futures[future]
+            actual, error = future.result()
+            yield product, link, checksum, actual, error
+
+
+def main(argv=None):
+    import entydata
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("products", nargs="*", metavar="product",
+                        help=f"products to verify (default: all of {', '.join(entydata.SCRAPERS)})")
+    parser.add_argument("--assets-dir", default=entydata.ASSETS_DIR, help="asset directory (default: assets)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="hashing processes")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="bytes read and hashed at a time")
+    parser.add_argument("--timeout", type=float, default=60.0, help="HTTP timeout in seconds (default: 60)")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.products if name not in entydata.SCRAPERS]
+    if unknown:
+        parser.error(f"unknown product(s): {', '.join(unknown)}")
+
+    items = []
+    for name in args.products or list(entydata.SCRAPERS):
+        path = os.path.join(args.assets_dir, entydata.SCRAPERS[name].output)
+        if not os.path.exists(path):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            items.extend(iter_checksummed(json.load(f)))
+
+    failed = 0
+    for product, link, checksum, actual, error in verify(items, args.workers, args.chunk_size, args.timeout):
+        if error is not None:
+            failed += 1
+            print(f"[ERROR] {product} {link}: {error}")
+        elif actual != parse_checksum(checksum)[1]:
+            failed += 1
+            print(f"[MISMATCH] {product} {link}: expected {checksum}, got {actual}")
+        else:
+            print(f"[ OK ] {product} {link}")
+    print(f"Verified {len(items) - failed}/{len(items)} downloads")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,20 +1,36 @@
 
 
-import httpx
-from bs4 import BeautifulSoup
+from bs4 import SoupStrainer
 import re
-from utils import VersionHandling, SimpleVersion
+from utils import Release, VersionHandling, SimpleVersion, make_soup, serialize_releases
+from registry import Scraper
 
-class ComposerScrape:
-    def __init__(self):
+# Pre-release versions such as "2.8.0-RC1" or "2.0.0-alpha3"
+PRE_RELEASE = re.compile(r'-(RC|alpha)(\d*)$', re.IGNORECASE)
+
+# The releases are all listed in the single table of the download page
+RELEASE_TABLE = SoupStrainer("table")
+
+
+class ComposerScrape(Scraper):
+    name = "composer"
+
+    def __init__(self, client=None):
+        super().__init__(client)
         self.url = "https://getcomposer.org/download/"
         self.base_url = "https://getcomposer.org"
         self.min_version = "2.2.0"
         self.max_version = "2.8.10"
+        # Pre-parsed bounds, compared against every release row
+        self.min_key = VersionHandling.v2tuple(self.min_version)
+        self.max_key = VersionHandling.v2tuple(self.max_version)
+
+    def run(self, **options):
+        return self.scrape(**options)
 
     def scrape(self):
-        response = httpx.get(self.url)
-        bs = BeautifulSoup(response.text, "html.parser")
+        response = self.client.get(self.url)
+        bs = make_soup(response.text, RELEASE_TABLE)
         releases = []
         table = bs.find('table')
         if table:
@@ -22,15 +38,9 @@ class ComposerScrape:
                 tds = tr.find_all('a', href=True)
                 if tds:
                     version = tds[0].text.strip()
-                    # Skip RC and alpha versions
-                    if re.search(r'-(RC|alpha)(\d*)$', version, re.IGNORECASE):
-                        continue
-                    # Only include versions in min-max range
-                    v2tuple = VersionHandling.v2tuple
-                    if version.startswith('2.') and v2tuple(self.min_version) <= v2tuple(version) <= v2tuple(self.max_version):
-                        # Find date (second <td>), sha256sum (in <code>), and download link
-                        tds_all = tr.find_all('td')
-                        date = tds_all[1].text.strip() if len(tds_all) > 1 else ''
+                    # Skip RC and alpha versions, only include versions in min-max range
+                    if self.filter_versions(version):
+                        # Find sha256sum (in <code>) and download link
                         sha256sum = ''
                         code = tr.find('code', title='sha256 checksum')
                         if code:
@@ -41,67 +51,31 @@ class ComposerScrape:
                             if a['href'].endswith('/composer.phar'):
                                 download_url = self.base_url + a['href'] if a['href'].startswith('/') else a['href']
                                 break
-                        releases.append({
-                            "version": version,
-                            "date": date,
-                            "sha256sum": sha256sum,
-                            "download_url": download_url
-                        })
-        
-        # Create data for each OS (Composer is cross-platform)
-        os_data = []
-        
-        # Windows data
-        windows_data = []
-        for release in releases:
-            windows_data.append({
-                "version": release["version"],
-                "gpg": "",  # Composer doesn't provide GPG signatures, but has sha256
-                "link": release["download_url"]
-            })
-        os_data.append({"os": "Windows", "data": windows_data})
-        
-        # Linux data
-        linux_data = []
-        for release in releases:
-            linux_data.append({
-                "version": release["version"],
-                "gpg": "",  # Composer doesn't provide GPG signatures, but has sha256
-                "link": release["download_url"]
-            })
-        os_data.append({"os": "Linux", "data": linux_data})
-        
-        # macOS data
-        macos_data = []
-        for release in releases:
-            macos_data.append({
-                "version": release["version"],
-                "gpg": "",  # Composer doesn't provide GPG signatures, but has sha256
-                "link": release["download_url"]
-            })
-        os_data.append({"os": "macOS", "data": macos_data})
+                        # Composer doesn't provide GPG signatures, but has sha256;
+                        # the same phar is offered for every OS
+                        releases.append(Release(version, download_url,
+                                                checksum=f"sha256:{sha256sum}" if sha256sum else ""))
         
-        return {"composer": os_data}
+        return serialize_releases("composer", releases)
 
     def filter_versions(self, version):
-        v2tuple = VersionHandling.v2tupl
         # Only include versions that start with '2.' and are not RC or alpha, and in min-max range
-        if re.search(r'-(RC|alpha)(\d*)$', version, re.IGNORECASE):
+        if PRE_RELEASE.search(version):
             return False
-        if version.startswith('2.') and v2tuple(self.min_version) <= v2tuple(version) <= v2tuple(self.max_version):
+        if version.startswith('2.') and self.min_key <= VersionHandling.v2tuple(version) <= self.max_key:
             return True
         return False
 
     
 if __name__ == "__main__":
+    import catalog
     import json
     
     scraper = ComposerScrape()
     result = scraper.scrape()
     
-    # Save to JSON file like mysql.py does
-    with open("assets/composer.json", "w", encoding="utf-8") as f:
-        json.dump(result, f, indent=2, ensure_ascii=False)
+    # Written atomically, and merged into assets/catalog.json
+    catalog.publish(result, "composer.json")
     
     print("Saved all Composer download info to assets/composer.json")
     print(json.dumps(result, indent=2, ensure_ascii=False))
\ No newline at end of file
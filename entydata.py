@@ -0,0 +1,325 @@
+"""Refresh every EntyData asset from one process.
+
+    python -m entydata refresh            # every product
+    python -m entydata refresh nginx php  # only some of them
+    python -m entydata list               # the known products
+    python -m entydata serve              # serve the catalog over HTTP, see serve.py
+    python -m entydata schedule           # refresh each product on its own interval, see scheduler.py
+
+All scrapers run concurrently on one asyncio event loop, so a full refresh
+takes about as long as the slowest upstream instead of the sum of all of them.
+"""
+import argparse
+import contextlib
+import logging
+import os
+import sys
+import time
+from collections import defaultdict
+
+import catalog
+import metrics
+import registry
+
+ASSETS_DIR = catalog.ASSETS_DIR
+CACHE_DIR = os.path.join(".cache", "http")
+# linkcheck.LINK_CACHE and scheduler.STATE_FILE, spelled out so the command
+# line does not import asyncio or the scheduler
+LINK_CACHE = os.path.join(".cache", "links.json")
+STATE_FILE = os.path.join(".cache", "schedule.json")
+
+# name -> registry.ScraperSpec(module, class_name, output, host); the scraper
+# modules themselves are only imported when a product is run
+SCRAPERS = registry.SCRAPERS
+
+
+def run_scraper(name, **options):
+    """Import, build and run one scraper synchronously, returning its data."""
+    return registry.run(name, **options)
+
+
+def timed_scraper(name, **options):
+    """``run_scraper`` attributed to the ``scrape`` metrics phase."""
+    with metrics.phase("scrape"):
+        return run_scraper(name, **options)
+
+
+def scraper_host(name):
+    """Return the upstream host of a scraper, or None when it does not fetch anything."""
+    return SCRAPERS[name].host
+
+
+def save(name, data, assets_dir=ASSETS_DIR):
+    """Atomically write one product's shard, unless its content is unchanged."""
+    path = os.path.join(assets_dir, SCRAPERS[name].output)
+    if not catalog.write_json(path, data):
+        logging.info(f"{path} is unchanged")
+    return path
+
+
+async def refresh(names, concurrency=4, per_host=2, assets_dir=ASSETS_DIR, incremental=False, links=None,
+                  drop_dead=False):
+    """Run the given scrapers concurrently and save their assets.
+
+    ``concurrency`` caps how many scrapers run at once, ``per_host`` caps how
+    many of them may talk to the same upstream host at the same time. The
+    scrapers themselves are blocking, so each one runs in a worker thread.
+    With ``incremental``, MySQL only scrapes versions missing from its saved asset.
+    With a ``linkcheck.LinkChecker`` as ``links``, entries with dead links are
+    flagged (or left out with ``drop_dead``) before the assets are written.
+
+    Every product that was scraped is then merged into ``catalog.json``.
+
+    Returns a dict of name -> saved path, or the exception that scraper raised.
+    """
+    import asyncio
+
+    scraped = {}
+    limit = asyncio.Semaphore(concurrency)
+    host_limits = defaultdict(lambda: asyncio.Semaphore(per_host))
+    unlimited = asyncio.Semaphore(len(names) or 1)
+
+    async def run(name):
+        host = scraper_host(name)
+        async with limit, (host_limits[host] if host else unlimited):
+            start = time.perf_counter()
+            logging.info(f"Start scraping {name} ({host or 'offline'})")
+            options = {}
+            if incremental and name == "mysql":
+                options = {"incremental": True, "existing_path": os.path.join(assets_dir, SCRAPERS[name].output)}
+            with metrics.labels(product=name):
+                data = await asyncio.to_thread(timed_scraper, name, **options)
+            logging.info(f"Finished {name} in {time.perf_counter() - start:.2f}s")
+        if not data:
+            raise RuntimeError(f"{name} returned no data")
+        if links is not None:
+            with metrics.labels(product=name), metrics.phase("linkcheck"):
+                data, dead = await links.validate(data, drop_dead)
+            for url in dead:
+                logging.warning(f"Dead link in {name}: {url}")
+        path = save(name, data, assets_dir)
+        scraped.update(data)
+        return path
+
+    results = await asyncio.gather(*(run(name) for name in names), return_exceptions=True)
+    if scraped:
+        path, written = catalog.update_catalog(scraped, assets_dir)
+        logging.info(f"{path} {'updated' if written else 'is unchanged'}")
+    return dict(zip(names, results))
+
+
+async def run_refresh(names, args):
+    """``refresh`` with the options of the command line, and a link checker when asked for."""
+    if args.check_links is None:
+        return await refresh(names, args.concurrency, args.per_host, args.assets_dir, args.incremental)
+    import linkcheck
+    import utils
+
+    cache = linkcheck.LinkCache(args.link_cache)
+    try:
+        async with utils.make_async_client(timeout=args.timeout, record=args.record, replay=args.replay) as client:
+            return await refresh(names, args.concurrency, args.per_host, args.assets_dir, args.incremental,
+                                 links=linkcheck.LinkChecker(client, cache), drop_dead=args.check_links == "drop")
+    finally:
+        cache.save()
+
+
+def list_command(parser, args):
+    for name, spec in SCRAPERS.items():
+        print(f"{name:<12} {spec.host or '(offline)':<22} {spec.output}")
+    return 0
+
+
+def install_client(args):
+    """Make the shared HTTP client every scraper uses, configured by the refresh options."""
+    import httpx
+
+    import utils
+    from transports import HttpCache, RetryPolicy
+
+    utils.set_shared_client(utils.make_client(
+        timeout=httpx.Timeout(args.timeout, connect=min(args.timeout, 10.0)),
+        limits=httpx.Limits(max_connections=args.max_connections,
+                            max_keepalive_connections=args.max_connections // 2 or 1),
+        http2=False if args.no_http2 else None,
+        cache=None if args.no_cache or args.replay else HttpCache(args.cache_dir, args.cache_size * 1024 * 1024,
+                                                                  args.max_age),
+        record=args.record,
+        replay=args.replay,
+        retry=RetryPolicy(retries=args.retries, rate=args.rate_limit, max_concurrency=args.max_per_host),
+    ))
+
+
+def refresh_once(names, args):
+    """Run ``run_refresh`` to completion, writing the metrics files asked for. Returns its results."""
+    import asyncio
+
+    with contextlib.ExitStack() as stack:
+        recorder = stack.enter_context(metrics.recording()) if args.metrics_jsonl or args.metrics_prom else None
+        try:
+            return asyncio.run(run_refresh(names, args))
+        finally:
+            if args.metrics_jsonl:
+                recorder.write_jsonl(args.metrics_jsonl)
+            if args.metrics_prom:
+                recorder.write_prometheus(args.metrics_prom)
+
+
+def refresh_command(parser, args):
+    import utils
+
+    unknown = [name for name in args.products if name not in SCRAPERS]
+    if unknown:
+        parser.error(f"unknown product(s): {', '.join(unknown)}")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s: %(message)s")
+    names = args.products or list(SCRAPERS)
+    install_client(args)
+    start = time.perf_counter()
+    try:
+        results = refresh_once(names, args)
+    finally:
+        utils.close_shared_client()
+    failed = 0
+    for name, result in results.items():
+        if isinstance(result, BaseException):
+            failed += 1
+            print(f"[FAIL] {name}: {result}")
+        else:
+            print(f"[ OK ] {name} -> {result}")
+    print(f"Refreshed {len(names) - failed}/{len(names)} products in {time.perf_counter() - start:.2f}s")
+    return 1 if failed else 0
+
+
+def schedule_command(parser, args):
+    import scheduler
+    import utils
+
+    unknown = [name for name in args.products if name not in SCRAPERS]
+    intervals = {}
+    for item in args.interval:
+        name, _, seconds = item.partition("=")
+        try:
+            intervals[name] = float(seconds)
+        except ValueError:
+            parser.error(f"--interval expects PRODUCT=SECONDS, got {item!r}")
+        if name not in SCRAPERS:
+            unknown.append(name)
+    if unknown:
+        parser.error(f"unknown product(s): {', '.join(unknown)}")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s: %(message)s")
+    install_client(args)
+    jobs = scheduler.Scheduler(args.products or list(SCRAPERS), lambda names: refresh_once(names, args),
+                               state_path=args.state, intervals=intervals, jitter=args.jitter, backoff=args.backoff)
+    try:
+        if args.once:
+            results = jobs.run_due()
+            failed = [name for name, result in results.items() if isinstance(result, BaseException)]
+            print(f"Refreshed {len(results) - len(failed)}/{len(results)} due products")
+            return 1 if failed else 0
+        jobs.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        utils.close_shared_client()
+    return 0
+
+
+def serve_command(parser, args):
+    import serve
+    import utils
+    from transports import HttpCache
+
+    unknown = [name for name in args.products if name not in SCRAPERS]
+    if unknown:
+        parser.error(f"unknown product(s): {', '.join(unknown)}")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s: %(message)s")
+    if args.refresh_every:
+        utils.set_shared_client(utils.make_client(cache=HttpCache(CACHE_DIR)))
+    try:
+        serve.serve(args.host, args.port, args.catalog, args.watch_interval, args.refresh_every, args.products)
+    except FileNotFoundError as e:
+        parser.error(str(e))
+    finally:
+        utils.close_shared_client()
+    return 0
+
+
+def add_refresh_arguments(command):
+    """Add the scraping, HTTP client, link check and metrics options shared by refresh and schedule."""
+    command.add_argument("--concurrency", type=int, default=4, help="scrapers running at once (default: 4)")
+    command.add_argument("--per-host", type=int, default=2, help="scrapers per upstream host (default: 2)")
+    command.add_argument("--assets-dir", default=ASSETS_DIR, help="output directory (default: assets)")
+    command.add_argument("--incremental", action="store_true",
+                         help="only scrape MySQL versions missing from the existing asset")
+    command.add_argument("--timeout", type=float, default=30.0, help="HTTP timeout in seconds (default: 30)")
+    command.add_argument("--max-connections", type=int, default=32,
+                         help="pooled HTTP connections shared by all scrapers (default: 32)")
+    command.add_argument("--no-http2", action="store_true", help="only speak HTTP/1.1 to upstream hosts")
+    command.add_argument("--cache-dir", default=CACHE_DIR,
+                         help=f"on-disk HTTP cache revalidated with ETag/Last-Modified (default: {CACHE_DIR})")
+    command.add_argument("--no-cache", action="store_true", help="always download full upstream pages")
+    command.add_argument("--max-age", type=float, default=None,
+                         help="reuse cached pages younger than this many seconds without asking upstream")
+    command.add_argument("--cache-size", type=int, default=200, help="HTTP cache size bound in MB (default: 200)")
+    command.add_argument("--retries", type=int, default=3,
+                         help="retries of failed or throttled requests, with exponential backoff (default: 3)")
+    command.add_argument("--rate-limit", type=float, default=None, metavar="RPS",
+                         help="requests per second to each upstream host (default: unlimited)")
+    command.add_argument("--max-per-host", type=int, default=8,
+                         help="requests in flight per upstream host, halved while it throttles (default: 8)")
+    fixtures = command.add_mutually_exclusive_group()
+    fixtures.add_argument("--record", metavar="ARCHIVE", help="record every upstream response into a .json.gz archive")
+    fixtures.add_argument("--replay", metavar="ARCHIVE",
+                          help="answer requests from a recorded archive instead of the network (disables the cache)")
+    command.add_argument("--check-links", choices=("flag", "drop"),
+                         help="HEAD-check every download link and flag or drop the dead ones")
+    command.add_argument("--link-cache", default=LINK_CACHE,
+                         help=f"link check results reused across runs (default: {LINK_CACHE})")
+    command.add_argument("--metrics-jsonl", metavar="PATH",
+                         help="append one JSON line per upstream request and scraper stage to PATH")
+    command.add_argument("--metrics-prom", metavar="PATH",
+                         help="write per-host latency, bytes, cache hit and stage metrics as a Prometheus textfile")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="entydata", description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    list_cmd = commands.add_parser("list", help="print the known products, their upstream host and asset file")
+    list_cmd.set_defaults(handler=list_command)
+    refresh_cmd = commands.add_parser("refresh", help="scrape upstream sites and rewrite assets/")
+    refresh_cmd.set_defaults(handler=refresh_command)
+    refresh_cmd.add_argument("products", nargs="*", metavar="product",
+                             help=f"products to refresh (default: all of {', '.join(SCRAPERS)})")
+    add_refresh_arguments(refresh_cmd)
+    schedule_cmd = commands.add_parser("schedule", help="refresh every product on its own interval")
+    schedule_cmd.set_defaults(handler=schedule_command)
+    schedule_cmd.add_argument("products", nargs="*", metavar="product",
+                              help=f"products to schedule (default: all of {', '.join(SCRAPERS)})")
+    schedule_cmd.add_argument("--once", action="store_true", help="refresh the products due now, then exit")
+    schedule_cmd.add_argument("--state", default=STATE_FILE,
+                              help=f"last run of every product, kept across restarts (default: {STATE_FILE})")
+    schedule_cmd.add_argument("--interval", action="append", default=[], metavar="PRODUCT=SECONDS",
+                              help="override the refresh interval of a product (repeatable)")
+    schedule_cmd.add_argument("--jitter", type=float, default=0.1,
+                              help="fraction of the interval added or taken at random (default: 0.1)")
+    schedule_cmd.add_argument("--backoff", type=float, default=300.0,
+                              help="seconds before retrying a failed product, doubled per failure (default: 300)")
+    add_refresh_arguments(schedule_cmd)
+    serve_cmd = commands.add_parser("serve", help="serve the catalog over HTTP from memory")
+    serve_cmd.set_defaults(handler=serve_command)
+    serve_cmd.add_argument("products", nargs="*", metavar="product",
+                           help="products re-scraped by --refresh-every (default: all)")
+    serve_cmd.add_argument("--host", default="127.0.0.1", help="address to listen on (default: 127.0.0.1)")
+    serve_cmd.add_argument("--port", type=int, default=8080, help="port to listen on (default: 8080)")
+    serve_cmd.add_argument("--catalog", default=os.path.join(ASSETS_DIR, catalog.CATALOG_FILE),
+                           help="catalog file served, in any catalog format (default: assets/catalog.json)")
+    serve_cmd.add_argument("--watch-interval", type=float, default=5.0,
+                           help="seconds between checks of the catalog file for changes (default: 5)")
+    serve_cmd.add_argument("--refresh-every", type=float, default=None, metavar="SECONDS",
+                           help="re-scrape upstream in the background this often (default: never)")
+    args = parser.parse_args(argv)
+    return args.handler(parser, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,28 @@
 # -*- coding: utf-8 -*-
 
 import httpx
-from bs4 import BeautifulSoup
-from utils import VersionHandling
+from bs4 import SoupStrainer
+from utils import Release, VersionHandling, make_soup, serialize_releases, sort_versions
+from registry import Scraper
 
-class HeldiSqlScrape:
-    def __init__(self):
+# Only the old releases list holds the versioned Portable links
+OLD_RELEASES = SoupStrainer("ul", class_="oldreleases")
+
+class HeldiSqlScrape(Scraper):
+    name = "heidisql"
+
+    def __init__(self, client=None):
+        super().__init__(client)
         self.url = "https://www.heidisql.com/download.php#"
         self.min_version = "v12.6" # minimum version (inclusive)
         self.max_version = "v12.11" # maximum version (inclusive)
         self.base_url = "https://www.heidisql.com"
+        # Pre-parsed bounds, compared against every release in the list
+        self.min_key = VersionHandling.v2tuple(self.min_version.lstrip('v'))
+        self.max_key = VersionHandling.v2tuple(self.max_version.lstrip('v'))
+
+    def run(self, **options):
+        return self.show_download(**options)
 
     def get_portable_links(self, releases):
         """
@@ -19,8 +32,7 @@ class HeldiSqlScrape:
         version_map = {}
         import re
         def version_in_range(version):
-            v2tuple = VersionHandling.v2tuple
-            return v2tuple(self.min_version.lstrip('v')) <= v2tuple(version.lstrip('v')) <= v2tuple(self.max_version.lstrip('v'))
+            return self.min_key <= VersionHandling.v2tuple(version.lstrip('v')) <= self.max_key
 
         for li in releases:
             li_text = li.get_text()
@@ -47,11 +59,10 @@ class HeldiSqlScrape:
         return version_map
 
     def filter_version(self, text):
-        v2tuple = VersionHandling.v2tuple
         # Only include versions in the min-max range
         if text.startswith("v12."):
             version = text.split()[0]
-            if v2tuple(self.min_version.lstrip('v')) <= v2tuple(version.lstrip('v')) <= v2tuple(self.max_version.lstrip('v')):
+            if self.min_key <= VersionHandling.v2tuple(version.lstrip('v')) <= self.max_key:
                 return True
         return False
 
@@ -72,22 +83,39 @@ class HeldiSqlScrape:
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/138.0.0.0 Safari/537.36',
         }
         try:
-            with httpx.Client(headers=headers, http2=True) as session:
-                response = session.get(self.url)
-                bs = BeautifulSoup(response.text, "html.parser")
-                # Only focus on oldreleases section for v12.11 to v12.6 Portable links
-                oldreleases = bs.find('ul', class_='oldreleases')
-                # print("[DEBUG] oldreleases:", oldreleases)
-                if oldreleases:
-                    version_links = self.get_portable_links(oldreleases.find_all('li'))
-                    # print("[DEBUG] version_links:", version_links)
-                    return version_links
-                else:
-                    return {}
+            response = self.client.get(self.url, headers=headers)
+            bs = make_soup(response.text, OLD_RELEASES)
+            # Only focus on oldreleases section for v12.11 to v12.6 Portable links
+            oldreleases = bs.find('ul', class_='oldreleases')
+            # print("[DEBUG] oldreleases:", oldreleases)
+            if oldreleases:
+                version_links = self.get_portable_links(oldreleases.find_all('li'))
+                # print("[DEBUG] version_links:", version_links)
+                return version_links
+            else:
+                return {}
         except httpx.ConnectError as e:
             print(f"Connection error: {e}")
             return None
 
+    def show_download(self, result=None):
+        """Build the ``{"heidisql": [...]}`` data from the portable links of ``scrape``."""
+        if result is None:
+            result = self.scrape()
+        if not result:
+            return None
+        # Sort versions in descending order and create entries for each download,
+        # 64-bit before 32-bit; HeidiSQL doesn't provide GPG signatures
+        releases = []
+        for v, downloads in sort_versions(result.items(), key=lambda x: x[0].lstrip('v')):
+            version = v.lstrip('v')
+            for arch in ('64bit', '32bit'):
+                if arch in downloads:
+                    releases.append(Release(version, downloads[arch], os=("Windows",), arch=arch))
+
+        # Create data for Windows only
+        return serialize_releases("heidisql", releases, os_names=("Windows",))
+
 # print("[DEBUG] Starting HeldiSqlScrape...")
 # print("[DEBUG] Initializing HeldiSqlScrape instance...")
 # print("[DEBUG] Scraping HeldiSql releases...")
@@ -95,45 +123,15 @@ class HeldiSqlScrape:
 
 
 if __name__ == "__main__":
+    import catalog
     import json
     
     scraper = HeldiSqlScrape()
-    result = scraper.scrape()
+    output = scraper.show_download()
     
-    if result:
-        v2tuple = VersionHandling.v2tuple
-        
-        # Create data for Windows only
-        os_data = []
-        windows_data = []
-        
-        # Sort versions in descending order and create entries for each download
-        for v, downloads in sorted(result.items(), key=lambda x: v2tuple(x[0].lstrip('v')), reverse=True):
-            version = v.lstrip('v')
-            
-            # Add 64-bit version if available
-            if '64bit' in downloads:
-                windows_data.append({
-                    "version": version,
-                    "gpg": "",  # HeidiSQL doesn't provide GPG signatures
-                    "link": downloads['64bit']
-                })
-            
-            # Add 32-bit version if available
-            if '32bit' in downloads:
-                windows_data.append({
-                    "version": version,
-                    "gpg": "",  # HeidiSQL doesn't provide GPG signatures
-                    "link": downloads['32bit']
-                })
-        
-        os_data.append({"os": "Windows", "data": windows_data})
-        
-        output = {"heidisql": os_data}
-        
-        # Save to JSON file like mysql.py does
-        with open("assets/heldisql.json", "w", encoding="utf-8") as f:
-            json.dump(output, f, indent=2, ensure_ascii=False)
+    if output:
+        # Written atomically, and merged into assets/catalog.json
+        catalog.publish(output, "heldisql.json")
         
         print("Saved all HeidiSQL download info to assets/heldisql.json")
         print(json.dumps(output, indent=2, ensure_ascii=False))
@@ -0,0 +1,204 @@
+"""Check that the download links of scraped assets exist before they are written.
+
+    python linkcheck.py                  # report dead links in assets/
+    python linkcheck.py nodejs --drop    # and remove them from assets/nodejs.json
+
+Links are checked with concurrent HEAD requests (falling back to a one-byte
+ranged GET for servers that refuse HEAD), a few at a time per host. Results
+are cached by URL: links that worked are not checked again while the TTL
+holds (archived releases never disappear, so by default never), dead ones
+are retried after a day.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlparse
+
+import catalog
+import utils
+
+LINK_CACHE = os.path.join(".cache", "links.json")
+# Answers meaning the file is definitely gone; anything else failing is only reported as unknown
+DEAD_STATUSES = frozenset({404, 410})
+# Answers of servers that do not allow HEAD, checked again with a ranged GET
+HEAD_REFUSED = frozenset({403, 405, 501})
+
+
+class LinkCache:
+    """URL -> last check result, persisted as JSON with separate TTLs for live and dead links."""
+
+    def __init__(self, path=LINK_CACHE, ok_ttl=None, dead_ttl=24 * 3600):
+        """
+        Args:
+            path: JSON file the results are loaded from and saved to
+            ok_ttl: Seconds a working link is trusted (default: forever)
+            dead_ttl: Seconds a dead link is trusted before being checked again
+        """
+        self.path = path
+        self.ok_ttl = ok_ttl
+        self.dead_ttl = dead_ttl
+        self._lock = threading.Lock()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.results = json.load(f)
+        except (OSError, ValueError):
+            self.results = {}
+
+    def get(self, url):
+        """Return the cached status of ``url``, or None when unknown or expired."""
+        result = self.results.get(url)
+        if result is None:
+            return None
+        ttl = self.dead_ttl if result["status"] in DEAD_STATUSES else self.ok_ttl
+        if ttl is not None and time.time() - result["checked_at"] > ttl:
+            return None
+        return result["status"]
+
+    def set(self, url, status):
+        with self._lock:
+            self.results[url] = {"status": status, "checked_at": time.time()}
+
+    def save(self):
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.results, f, sort_keys=True)
+            os.replace(tmp, self.path)
+
+
+class LinkChecker:
+    """Check links concurrently on an async client, at most ``per_host`` at a time per host."""
+
+    def __init__(self, client, cache=None, per_host=4):
+        self.client = client
+        self.cache = cache
+        self.host_limits = defaultdict(lambda: asyncio.Semaphore(per_host))
+
+    async def _request(self, url):
+        response = await self.client.head(url, follow_redirects=True)
+        if response.status_code in HEAD_REFUSED:
+            async with self.client.stream("GET", url, headers={"Range": "bytes=0-0"},
+                                          follow_redirects=True) as response:
+                pass
+        return response.status_code
+
+    async def status(self, url):
+        """Return the HTTP status of ``url``, or None when it could not be reached."""
+        import httpx
+
+        if self.cache is not None:
+            cached = self.cache.get(url)
+            if cached is not None:
+                return cached
+        async with self.host_limits[urlparse(url).hostname]:
+            try:
+                status = await self._request(url)
+            except httpx.HTTPError as e:
+                logging.warning(f"Could not check {url}: {e}")
+                return None
+        if self.cache is not None and (status < 400 or status in DEAD_STATUSES):
+            self.cache.set(url, status)
+        return status
+
+    async def check(self, urls):
+        """Return ``{url: status or None}`` for every distinct URL."""
+        urls = list(dict.fromkeys(urls))
+        statuses = await asyncio.gather(*(self.status(url) for url in urls))
+        return dict(zip(urls, statuses))
+
+    async def validate(self, data, drop=False):
+        """
+        Check every link of asset data and mark or remove the dead entries.
+
+        Entries whose link is definitely gone (404/410) get ``"dead": true``,
+        or are left out with ``drop``. Links that could not be checked are
+        kept as they are. Returns the data and the list of dead links.
+        """
+        links = [entry["link"] for groups in data.values() for group in groups for entry in group["data"]
+                 if entry.get("link")]
+        statuses = await self.check(links)
+        dead = {url for url, status in statuses.items() if status in DEAD_STATUSES}
+        if not dead:
+            return data, []
+        if drop:
+            data = {
+                product: [dict(group, data=[entry for entry in group["data"] if entry.get("link") not in dead])
+                          for group in groups]
+                for product, groups in data.items()
+            }
+        else:
+            for groups in data.values():
+                for group in groups:
+                    for entry in group["data"]:
+                        if entry.get("link") in dead:
+                            entry["dead"] = True
+        return data, sorted(dead)
+
+
+async def validate_files(paths, drop=False, per_host=4, cache=None):
+    """
+    Check the links of asset files, rewriting the ones with dead links. Returns ``{path: dead links}``.
+
+    Rewritten shards are written atomically and merged into the catalog of
+    their directory, like a refresh does.
+    """
+    results = {}
+    # assets dir -> {product: [groups]} rewritten there
+    updates = defaultdict(dict)
+    async with utils.make_async_client() as client:
+        checker = LinkChecker(client, cache, per_host)
+        for path in paths:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            data, dead = await checker.validate(data, drop)
+            if dead and catalog.write_json(path, data):
+                updates[os.path.dirname(path)].update(data)
+            results[path] = dead
+    for assets_dir, products in updates.items():
+        catalog.update_catalog(products, assets_dir)
+    return results
+
+
+def main(argv=None):
+    import entydata
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("products", nargs="*", metavar="product",
+                        help=f"products to check (default: all of {', '.join(entydata.SCRAPERS)})")
+    parser.add_argument("--assets-dir", default=entydata.ASSETS_DIR, help="asset directory (default: assets)")
+    parser.add_argument("--drop", action="store_true", help="remove dead entries instead of flagging them")
+    parser.add_argument("--per-host", type=int, default=4, help="concurrent checks per host (default: 4)")
+    parser.add_argument("--cache", default=LINK_CACHE, help=f"link result cache (default: {LINK_CACHE})")
+    parser.add_argument("--ok-ttl", type=float, default=None,
+                        help="seconds before a working link is checked again (default: never)")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.products if name not in entydata.SCRAPERS]
+    if unknown:
+        parser.error(f"unknown product(s): {', '.join(unknown)}")
+
+    paths = [os.path.join(args.assets_dir, entydata.SCRAPERS[name].output) for name in args.products or entydata.SCRAPERS]
+    paths = [path for path in paths if os.path.exists(path)]
+    cache = LinkCache(args.cache, ok_ttl=args.ok_ttl)
+    try:
+        results = asyncio.run(validate_files(paths, args.drop, args.per_host, cache))
+    finally:
+        cache.save()
+    for path, dead in results.items():
+        for url in dead:
+            print(f"[DEAD] {path}: {url}")
+    total = sum(len(dead) for dead in results.values())
+    print(f"{total} dead link(s) {'dropped' if args.drop else 'flagged'} in {len(paths)} file(s)")
+    return 1 if total else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,208 @@
+"""Timing and metrics of scraper stages and upstream requests.
+
+Stages are marked with ``phase("name")`` around the code doing the work, and
+the shared HTTP client reports per-host latency, bytes, cache hits and cache
+revalidations through ``observe``/``increment``/``event``. All of these cost
+almost nothing until a ``Recorder`` is installed with ``recording()``, which
+then aggregates them across all threads and can export them as JSON lines and
+a Prometheus textfile.
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the latency and duration histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, float("inf"))
+
+# metric -> (prometheus type, help text)
+METRICS = {
+    "phase_seconds": ("histogram", "Time spent in a scraper stage"),
+    "http_request_duration_seconds": ("histogram", "Time until the response headers of an upstream request"),
+    "http_requests_total": ("counter", "Upstream requests by host and status"),
+    "http_response_bytes_total": ("counter", "Response body bytes received from upstream hosts"),
+    "http_cache_hits_total": ("counter", "Requests answered from the on-disk HTTP cache without asking upstream"),
+    "http_cache_revalidated_total": ("counter", "Requests answered from the on-disk HTTP cache after an upstream 304"),
+    "http_retries_total": ("counter", "Upstream requests retried after a failure or throttling"),
+}
+PREFIX = "entydata_"
+
+_active = None
+# Labels (e.g. the product being scraped) added to phases and events recorded in this context
+_context = contextvars.ContextVar("metrics_context", default={})
+
+
+class Histogram:
+    """Cumulative-bucket histogram of observed values."""
+
+    __slots__ = ("buckets", "sum", "count")
+
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.buckets[i] += 1
+
+
+class Recorder:
+    """Phase totals, labelled histograms and counters, and the raw event log."""
+
+    def __init__(self):
+        self.totals = defaultdict(float)
+        self.counts = defaultdict(int)
+        self.histograms = defaultdict(Histogram)
+        self.counters = defaultdict(float)
+        self.events = []
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds, **labels):
+        """Record time spent in the phase ``name``."""
+        labels = {**_context.get(), **labels}
+        with self._lock:
+            self.totals[name] += seconds
+            self.counts[name] += 1
+            self.histograms[("phase_seconds", _labels(phase=name, **labels))].observe(seconds)
+            self.events.append({"ts": time.time(), "type": "phase", "phase": name, "seconds": seconds, **labels})
+
+    def observe(self, metric, value, **labels):
+        with self._lock:
+            self.histograms[(metric, _labels(**labels))].observe(value)
+
+    def increment(self, metric, value=1, **labels):
+        with self._lock:
+            self.counters[(metric, _labels(**labels))] += value
+
+    def event(self, **fields):
+        with self._lock:
+            self.events.append({"ts": time.time(), **_context.get(), **fields})
+
+    def write_jsonl(self, path):
+        """Append every recorded event to ``path`` as one JSON object per line."""
+        with self._lock:
+            events = list(self.events)
+        with open(path, "a", encoding="utf-8") as f:
+            for event in events:
+                f.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+    def prometheus(self):
+        """Return the aggregated metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for metric, (kind, help_text) in METRICS.items():
+                name = PREFIX + metric
+                series = [(labels, value) for (m, labels), value in
+                          (self.histograms if kind == "histogram" else self.counters).items() if m == metric]
+                if not series:
+                    continue
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in sorted(series, key=lambda item: item[0]):
+                    if kind == "counter":
+                        lines.append(f"{name}{_format_labels(labels)} {value:g}")
+                        continue
+                    for bound, count in zip(BUCKETS, value.buckets):
+                        le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                        lines.append(f"{name}_bucket{_format_labels(labels + (('le', le),))} {count}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {value.sum:g}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {value.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Write the Prometheus textfile atomically, as the node exporter's textfile collector expects."""
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.prometheus())
+        os.replace(tmp, path)
+
+
+def _labels(**labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in labels)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + "}"
+
+
+def enabled():
+    """Return True while a recorder is installed."""
+    return _active is not None
+
+
+@contextmanager
+def labels(**values):
+    """Add ``values`` to the labels of phases and events recorded in the ``with`` block.
+
+    Threads started through ``asyncio.to_thread`` inherit them; plain thread
+    pools need ``contextvars.copy_context().run`` to carry them over.
+    """
+    token = _context.set({**_context.get(), **values})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+@contextmanager
+def phase(name, **labels):
+    """Attribute the time spent in the ``with`` block to the phase ``name``."""
+    recorder = _active
+    if recorder is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        recorder.add(name, time.perf_counter() - start, **labels)
+
+
+def record_phase(name, seconds, **labels):
+    """Attribute ``seconds`` measured elsewhere (e.g. in a worker process) to the phase ``name``."""
+    recorder = _active
+    if recorder is not None:
+        recorder.add(name, seconds, **labels)
+
+
+def observe(metric, value, **labels):
+    """Add a value to the histogram ``metric`` of the active recorder, if any."""
+    recorder = _active
+    if recorder is not None:
+        recorder.observe(metric, value, **labels)
+
+
+def increment(metric, value=1, **labels):
+    """Add to the counter ``metric`` of the active recorder, if any."""
+    recorder = _active
+    if recorder is not None:
+        recorder.increment(metric, value, **labels)
+
+
+def event(**fields):
+    """Append an event to the log of the active recorder, if any."""
+    recorder = _active
+    if recorder is not None:
+        recorder.event(**fields)
+
+
+@contextmanager
+def recording():
+    """Install a fresh ``Recorder`` for the duration of the ``with`` block and yield it."""
+    global _active
+    previous = _active
+    _active = Recorder()
+    try:
+        yield _active
+    finally:
+        _active = previous
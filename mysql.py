@@ -1,97 +1,330 @@
-import httpx
-from bs4 import BeautifulSoup
+from bs4 import SoupStrainer
 import re
-from tqdm import tqdm
-from utils import VersionHandling
+from utils import ALL_OS, Release, make_soup, serialize_releases, shared_client, sort_versions
+from registry import Scraper
+import concurrent.futures
+import contextlib
+import json
 import logging
+import os
+import sys
+import threading
+import time
 
+import metrics
 import utils
 
-class MysqlScrape:
-    def __init__(self):
+DATABASE_PATH = "assets/database.json"
+# Platform pages only need their download table parsed
+PLATFORM_TABLE = SoupStrainer("table")
+# Packages whose name contains any of these are left out
+BLOCK_LIST = ("32-bit", "test", "minimal", "ia-64", "debug")
+BLOCKED_PACKAGE = re.compile("|".join(map(re.escape, BLOCK_LIST)), re.IGNORECASE)
+SKIPPED_EXTENSIONS = (".msi", ".tar.gz", ".dmg")
+PARENTHESES = str.maketrans("", "", "()")
+# Fields of the compact package tuples returned by parse_platform_page
+PACKAGE_FIELDS = ("url", "file_name", "md5", "gpg")
+# Platform pages a parsing process handles before it is replaced, which
+# hands the memory of the parsed trees back to the OS every so often
+PARSE_TASKS_PER_CHILD = 64
+
+
+def parse_platform_page(content, encoding, target_os):
+    """
+    Parse the raw bytes of a platform page into ``PACKAGE_FIELDS`` tuples.
+
+    This is the CPU-bound part of a MySQL scrape, run in a worker process:
+    only the page bytes are sent there and only the small tuples come back.
+    Returns the tuples and the seconds spent parsing.
+    """
+    start = time.perf_counter()
+    html = content.decode(encoding or "utf-8", errors="replace")
+    packages = [tuple(package[field] for field in PACKAGE_FIELDS)
+                for package in MysqlScrape.platform_packages(html, target_os)]
+    return packages, time.perf_counter() - start
+
+
+class MysqlScrape(Scraper):
+    name = "mysql"
+    OS_DISPLAY = {"win": "Windows", "linux": "Linux", "mac": "macOS"}
+
+    def __init__(self, client=None, parse_workers=None):
+        """
+        Args:
+            client: HTTP client (default: the shared one)
+            parse_workers: Processes parsing the platform pages (default: one
+                per CPU when there are several, 0: parse in the fetching threads)
+        """
+        super().__init__(client)
         self.community_url_download = "https://downloads.mysql.com/archives/community/"
         self.latest_mysql_url = "https://dev.mysql.com/downloads/mysql/"
         self.accepted_versions = ["8.2", "8.1", "8.0", "5.7", "5.6", "5.5"]
         self.os_handling = {"win": 3, "linux": 2, "mac": 33}
-        self.block_list = ["32-bit", "test", "minimal", "ia-64", "debug"]
+        self.block_list = list(BLOCK_LIST)
+        self._versions = None
+        self._versions_lock = threading.Lock()
+        if parse_workers is None:
+            # A single CPU gains nothing from handing pages to another process
+            parse_workers = os.cpu_count() or 1
+            parse_workers = parse_workers if parse_workers > 1 else 0
+        self.parse_workers = parse_workers
+        self._parse_pool = None
+
+    def run(self, **options):
+        return self.scrape(**options)
+
+    @staticmethod
+    def scrape_base(url_base, target_os, client=None):
+        client = client if client is not None else shared_client()
+        response = client.get(url_base)
+        response.raise_for_status()
+        return list(MysqlScrape.platform_packages(response.text, target_os))
 
     @staticmethod
-    def scrape_base(url_base, target_os):
-        bs = BeautifulSoup(httpx.get(url_base).text, "html.parser")
-        table = bs.find("table").find_all("tr")
-        table = [row for row in table if len(row.find_all("td")) == 4]
-        results = []
-        for row in table:
-            td_element = row.find_all("td")
-            package_name = td_element[0].text
-            if any(block in package_name.lower() for block in MysqlScrape().block_list):
+    def platform_packages(html, target_os):
+        """Parse the download table of a platform page and yield its packages, see ``iter_packages``."""
+        table = make_soup(html, PLATFORM_TABLE).find("table")
+        if table is None:
+            return iter(())
+        return MysqlScrape.iter_packages(table, target_os)
+
+    @staticmethod
+    def iter_packages(table, target_os):
+        """
+        Yield the package records of a platform page's download table, one at a time.
+
+        Each package takes two rows: one with its name and download link, then
+        one with the file name, MD5 and signature link. Rows are visited once,
+        in a single pass, each package row waiting for the row that follows it.
+        """
+        pending = None
+        for row in table.find_all("tr"):
+            cells = [cell for cell in row.children if cell.name == "td"]
+            if pending is not None:
+                record = MysqlScrape.package_record(pending, cells, target_os)
+                if record is not None:
+                    yield record
+                pending = None
+            if len(cells) != 4 or BLOCKED_PACKAGE.search(cells[0].text):
                 continue
-            url = td_element[3].find("a").get("href")
-            next_line = row.find_next_sibling().find_all("td")
-            file_name = re.sub(r"[()]", "", next_line[0].text) # fastest way
-        
+            url = cells[3].a.get("href")
             # Exclude unwanted file extensions globally
-            if url.endswith((".msi", ".tar.gz", ".dmg")):
-                continue
-        
-            md5 = next_line[1].find("code", {"class": "md5"}).text
-            try:
-                gpg = next_line[1].find("a", {"class": "signature"}).get("href")
-            except (TypeError, AttributeError):
-                print(f"Skipping {file_name} due to missing GPG signature, maybe they are not available yet.")
-                continue
+            if not url.endswith(SKIPPED_EXTENSIONS):
+                pending = url
+
+    @staticmethod
+    def package_record(url, cells, target_os):
+        """Build the record of a package from its download link and the cells of its file row."""
+        if len(cells) < 2:
+            return None
+        file_name = cells[0].text.translate(PARENTHESES)
+        md5 = signature = None
+        for tag in cells[1].find_all(("code", "a")):
+            classes = tag.get("class") or ()
+            if md5 is None and tag.name == "code" and "md5" in classes:
+                md5 = tag.text
+            elif signature is None and tag.name == "a" and "signature" in classes:
+                signature = tag
+        if signature is None or signature.get("href") is None:
+            print(f"Skipping {file_name} due to missing GPG signature, maybe they are not available yet.")
+            return None
+        gpg = signature.get("href")
+        return {
+            "os": target_os,
+            "url": ("https://downloads.mysql.com" + url if url.startswith("/") else url),
+            "file_name": file_name,
+            "md5": md5 or "",
+            "gpg": ("https://downloads.mysql.com" + gpg if gpg.startswith("/") else gpg),
+        }
+
+    def available_versions(self):
+        """
+        Return the GA versions listed on the archive page.
 
-            results.append({
-                "os": target_os,
-                "url": ("https://downloads.mysql.com" + url if url.startswith("/") else url),
-                "file_name": file_name,
-                "md5": md5,
-                "gpg": ("https://downloads.mysql.com" + gpg if gpg.startswith("/") else gpg),
-            })
+        The page is fetched and parsed only once per instance, so every OS
+        target shares the same discovery result.
+        """
+        with self._versions_lock:
+            if self._versions is None:
+                bs = make_soup(self.client.get(self.community_url_download).text)
+                available_versions = bs.find("label", string="Product Version:").parent.find_all("option")
+                allowed_versions = [version.text for version in available_versions if version.text.startswith(tuple(self.accepted_versions))]
+                exclude_keywords = ["rc", "alpha", "beta", "snapshot", "dmr"]
+                self._versions = [
+                    version for version in allowed_versions
+                    if not any(x in version.lower() for x in exclude_keywords)
+                    and not re.search(r"m([1-9]|1[0-9]|20)\b", version.lower())
+                ]
+                logging.info(f"Discovered {len(self._versions)} MySQL versions")
+        return list(self._versions)
+
+    def jobs(self, os_list=None):
+        """Return the (os, version) pairs to scrape for the given OS keys (default: all)."""
+        os_list = list(self.os_handling) if os_list is None else os_list
+        for os_name in os_list:
+            if os_name not in self.os_handling:
+                raise ValueError(f"Unsupported OS: {os_name}. Supported OS are: {list(self.os_handling.keys())}")
+        versions = self.available_versions()
+        return [(os_name, version) for os_name in os_list for version in versions]
+
+    def fetch_version(self, os_name, version):
+        """Scrape the platform page of one version for one OS."""
+        url = f"{self.community_url_download}?tpl=platform&os={self.os_handling[os_name]}&version={version}"
+        logging.info(f"Fetching version {version} for OS {os_name}")
+        response = self.client.get(url)
+        response.raise_for_status()
+        results = [{"os": os_name, **dict(zip(PACKAGE_FIELDS, package)), "version": version}
+                   for package in self.parse_page(response.content, response.encoding, os_name)]
+        logging.info(f"Completed version {version} for OS {os_name} ({len(results)} packages)")
         return results
 
-    def get_mysql_older(self, os):
-        import concurrent.futures
-        import logging
+    def parse_page(self, content, encoding, target_os):
+        """Parse a platform page on the parsing processes of the running ``scrape_jobs``, or right here."""
+        if self._parse_pool is None:
+            return parse_platform_page(content, encoding, target_os)[0]
+        packages, seconds = self._parse_pool.submit(parse_platform_page, content, encoding, target_os).result()
+        metrics.record_phase("parse", seconds)
+        return packages
+
+    @contextlib.contextmanager
+    def parsing(self, jobs):
+        """Run the platform pages of ``jobs`` through a pool of parsing processes inside the ``with`` block."""
+        workers = min(self.parse_workers, len(jobs))
+        if workers < 1 or len(jobs) < 2:
+            yield
+            return
+        # Recycling workers needs a start method other than fork, which 3.11+ picks by itself
+        recycling = {"max_tasks_per_child": PARSE_TASKS_PER_CHILD} if sys.version_info >= (3, 11) else {}
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers, **recycling) as pool:
+            self._parse_pool = pool
+            try:
+                yield
+            finally:
+                self._parse_pool = None
+
+    def scrape_jobs(self, jobs, max_workers=8, on_done=None):
+        """
+        Run (os, version) jobs from every OS on a single thread pool.
+
+        Threads only download the platform pages; the pages are parsed on a
+        pool of ``parse_workers`` processes, so parsing is not serialized by
+        the GIL and does not hold up the downloads either.
+        A failing job is logged and skipped so the rest of the run survives.
+        ``on_done`` is called with each finished job, e.g. to update a progress bar.
+        """
+        import contextvars
 
         release_url = []
-        bs = BeautifulSoup(httpx.get(self.community_url_download).text, "html.parser")
-        available_versions =  bs.find("label", string="Product Version:").parent.find_all("option")
-        available_versions = [version.text for version in available_versions if version.text.startswith(tuple(self.accepted_versions))]
-        allowed_versions = [version for version in available_versions if version.startswith(tuple(self.accepted_versions))]
-        exclude_keywords = ["rc", "alpha", "beta", "snapshot", "dmr"]
-        allowed_versions = [
-            version for version in allowed_versions
-            if not any(x in version.lower() for x in exclude_keywords)
-            and not re.search(r"m([1-9]|1[0-9]|20)\b", version.lower())
-        ]
-        if os not in self.os_handling:
-            raise ValueError(f"Unsupported OS: {os}. Supported OS are: {list(self.os_handling.keys())}")
-        os_id = self.os_handling[os]
-
-        def fetch_version(version):
-            url = f"{self.community_url_download}?tpl=platform&os={os_id}&version={version}"
-            logging.info(f"Fetching version {version} for OS {os}")
-            info_pkgs = self.scrape_base(url, os)
-            results = []
-            if info_pkgs:
-                for pkg in info_pkgs:
-                    pkg["version"] = version
-                    results.append(pkg)
-            logging.info(f"Completed version {version} for OS {os} ({len(results)} packages)")
-            return results
-
-        with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
-            futures = [executor.submit(fetch_version, version) for version in allowed_versions]
+        with self.parsing(jobs), concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # Workers run in a copy of the caller's context to keep its metrics labels
+            futures = {executor.submit(contextvars.copy_context().run, self.fetch_version, os_name, version):
+                       (os_name, version) for os_name, version in jobs}
             for future in concurrent.futures.as_completed(futures):
-                release_url.extend(future.result())
-
+                os_name, version = futures[future]
+                try:
+                    release_url.extend(future.result())
+                except Exception as e:
+                    logging.error(f"Error scraping version {version} for OS {os_name}: {e}")
+                if on_done is not None:
+                    on_done(os_name, version)
         return release_url
 
+    def get_mysql_older(self, os_name):
+        return self.scrape_jobs(self.jobs([os_name]))
+
+    @staticmethod
+    def group_entries(entries, existing=None):
+        """
+        Group scraped packages by OS, one entry per version, newest first.
+
+        Entries of ``existing`` (previously saved ``{"mysql": [...]}`` data) are
+        merged in and win over newly scraped ones for the same version.
+        """
+        # OS display name -> version -> release; only one entry per version (first one found)
+        grouped = {os_name: {} for os_name in ALL_OS}
+        for group in (existing or {}).get("mysql", []):
+            versions = grouped.setdefault(group["os"], {})
+            for entry in group["data"]:
+                if entry["version"] not in versions:
+                    versions[entry["version"]] = Release(
+                        entry["version"], entry.get("link", ""), os=(group["os"],), gpg=entry.get("gpg", ""),
+                        checksum=entry.get("checksum", ""))
+        for entry in entries:
+            os_key = entry.get("os", "Unknown")
+            os_name = MysqlScrape.OS_DISPLAY.get(os_key, os_key)
+            versions = grouped.setdefault(os_name, {})
+            version = entry.get("version", "")
+            if version not in versions:
+                md5 = entry.get("md5", "")
+                versions[version] = Release(version, entry.get("url", ""), os=(os_name,),
+                                            gpg=entry.get("gpg", ""), checksum=f"md5:{md5}" if md5 else "")
+
+        releases = [
+            release
+            for versions in grouped.values()
+            for release in sort_versions(versions.values(), key=lambda release: release.version)
+        ]
+        return serialize_releases("mysql", releases, os_names=tuple(grouped), skip_empty=True)
+
+    @staticmethod
+    def load_existing(path=DATABASE_PATH):
+        """Return the saved ``{"mysql": [...]}`` data at ``path``, or None if there is none."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning(f"No usable existing MySQL data at {path}: {e}")
+            return None
+
+    def missing_jobs(self, existing, os_list=None):
+        """
+        Return the (os, version) jobs whose version is not in ``existing`` yet.
+
+        Archived platform pages never change, so only newly discovered versions
+        need to be scraped. Versions with no package for an OS are not stored
+        and are therefore asked for again on every run.
+        """
+        known = {
+            os_name: {entry["version"] for group in (existing or {}).get("mysql", [])
+                      if group["os"] == display for entry in group["data"]}
+            for os_name, display in self.OS_DISPLAY.items()
+        }
+        return [(os_name, version) for os_name, version in self.jobs(os_list)
+                if version not in known.get(os_name, ())]
+
+    def scrape(self, incremental=False, existing_path=DATABASE_PATH):
+        """
+        Scrape every supported OS and return the grouped ``{"mysql": [...]}`` data.
+
+        With ``incremental``, only versions missing from the data saved at
+        ``existing_path`` are scraped and merged into it.
+        """
+        existing = self.load_existing(existing_path) if incremental else None
+        jobs = self.missing_jobs(existing) if incremental else self.jobs()
+        logging.info(f"Scraping {len(jobs)} MySQL version/OS pairs")
+        entries = [
+            {"os": pkg["os"], "url": pkg["url"], "version": pkg["version"], "md5": pkg["md5"]}
+            for pkg in self.scrape_jobs(jobs)
+        ]
+        return self.group_entries(entries, existing)
 
-import json
 
 if __name__ == "__main__":
+    import argparse
+
+    from tqdm import tqdm
+
+    import catalog
+
+    parser = argparse.ArgumentParser(description="Scrape MySQL Community Server downloads.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only scrape versions missing from the existing data and merge them in")
+    parser.add_argument("--existing", default=DATABASE_PATH, help=f"existing data for --incremental (default: {DATABASE_PATH})")
+    parser.add_argument("--output", default=DATABASE_PATH, help=f"output file (default: {DATABASE_PATH})")
+    parser.add_argument("--parse-workers", type=int, default=None,
+                        help="processes parsing platform pages (default: one per CPU if several, 0: parse in the fetch threads)")
+    args = parser.parse_args()
+
     # Setup logging to logs.txt with real-time flush
     logging.basicConfig(
         level=logging.INFO,
@@ -106,92 +339,24 @@ if __name__ == "__main__":
         if isinstance(handler, logging.FileHandler):
             handler.flush = handler.stream.flush
 
-    scraper = MysqlScrape()
+    scraper = MysqlScrape(parse_workers=args.parse_workers)
+    existing = scraper.load_existing(args.existing) if args.incremental else None
+    jobs = scraper.missing_jobs(existing) if args.incremental else scraper.jobs()
+    logging.info(f"Start scraping {len(jobs)} version/OS pairs")
+    with tqdm(total=len(jobs), desc="MySQL versions") as version_bar:
+        entries = scraper.scrape_jobs(jobs, on_done=lambda os_name, version: version_bar.update(1))
     all_data = []
-    os_list = ["win", "linux", "mac"]
-    for os_name in tqdm(os_list, desc="OS Progress"):
-        logging.info(f"Start scraping for OS: {os_name}")
-        try:
-            # Prepare version list for progress bar
-            bs = BeautifulSoup(httpx.get(scraper.community_url_download).text, "html.parser")
-            available_versions =  bs.find("label", string="Product Version:").parent.find_all("option")
-            available_versions = [version.text for version in available_versions if version.text.startswith(tuple(scraper.accepted_versions))]
-            allowed_versions = [version for version in available_versions if version.startswith(tuple(scraper.accepted_versions))]
-            exclude_keywords = ["rc", "alpha", "beta", "snapshot", "dmr"]
-            allowed_versions = [
-                version for version in allowed_versions
-                if not any(x in version.lower() for x in exclude_keywords)
-                and not re.search(r"m([1-9]|1[0-9]|20)\b", version.lower())
-            ]
-            from concurrent.futures import ThreadPoolExecutor, as_completed
-            version_bar = tqdm(total=len(allowed_versions), desc=f"{os_name} versions", leave=False)
-            entries = []
-            def fetch_and_collect(version):
-                try:
-                    url = f"{scraper.community_url_download}?tpl=platform&os={scraper.os_handling[os_name]}&version={version}"
-                    info_pkgs = scraper.scrape_base(url, os_name)
-                    result = []
-                    if info_pkgs:
-                        for pkg in info_pkgs:
-                            pkg["version"] = version
-                            result.append(pkg)
-                    logging.info(f"Completed version {version} for OS {os_name} ({len(result)} packages)")
-                    return result
-                finally:
-                    version_bar.update(1)
-            with ThreadPoolExecutor(max_workers=8) as executor:
-                futures = [executor.submit(fetch_and_collect, version) for version in allowed_versions]
-                for future in as_completed(futures):
-                    entries.extend(future.result())
-            version_bar.close()
-            logging.info(f"Found {len(entries)} entries for {os_name}")
-            for entry in entries:
-                if entry is None:
-                    logging.warning(f"Skipped None entry for {os_name}")
-                    continue
-                all_data.append({
-                    "os": entry.get("os", os_name),
-                    "url": entry.get("url"),
-                    "version": entry.get("version")
-                })
-                logging.info(f"Added entry: OS={entry.get('os', os_name)}, version={entry.get('version')}, url={entry.get('url')}")
-        except Exception as e:
-            logging.error(f"Error scraping {os_name}: {e}")
-    # Map internal OS keys to display names
-    os_display = {"win": "Windows", "linux": "Linux", "mac": "macOS"}
-    grouped = {"Windows": [], "Linux": [], "macOS": []}
-    
-    for entry in all_data:
-        os_key = entry.get("os", "Unknown")
-        os_name = os_display.get(os_key, os_key)
-        grouped.setdefault(os_name, []).append({
-            "version": entry.get("version", ""),
-            "gpg": entry.get("gpg", ""),
-            "link": entry.get("url", "")
+    for entry in entries:
+        all_data.append({
+            "os": entry["os"],
+            "url": entry.get("url"),
+            "version": entry.get("version"),
+            "md5": entry.get("md5", ""),
         })
-    
-    # For each OS, group by version and sort by version descending
-    mysql_list = []
-    for os_name, data in grouped.items():
-        if not data:
-            continue
-        version_map = {}
-        for entry in data:
-            version = entry.get("version", "")
-            # Only keep one entry per version (first one found)
-            if version not in version_map:
-                version_map[version] = {
-                    "version": version,
-                    "gpg": entry.get("gpg", ""),
-                    "link": entry.get("link", "")
-                }
-
-        sorted_versions = sorted(version_map.keys(), key=VersionHandling.version_key, reverse=True)
-        ordered_data = [version_map[v] for v in sorted_versions]
-        mysql_list.append({"os": os_name, "data": ordered_data})
-    
-    db = {"mysql": mysql_list}
-    with open("database.json", "w", encoding="utf-8") as f:
-        json.dump(db, f, indent=2, ensure_ascii=False)
-    logging.info("Saved all MySQL download info to database.json")
-    print("Saved all MySQL download info to database.json")
+        logging.info(f"Added entry: OS={entry['os']}, version={entry.get('version')}, url={entry.get('url')}")
+    logging.info(f"Found {len(all_data)} entries")
+    db = MysqlScrape.group_entries(all_data, existing)
+    # Written atomically, and merged into the catalog next to it
+    catalog.publish(db, os.path.basename(args.output), os.path.dirname(args.output))
+    logging.info(f"Saved all MySQL download info to {args.output}")
+    print(f"Saved all MySQL download info to {args.output}")
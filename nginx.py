@@ -1,14 +1,23 @@
-import httpx
 import re
-from bs4 import BeautifulSoup
-from utils import VersionHandling
+from contextlib import closing
+from utils import Release, serialize_releases, sort_versions, stream_lines
+from registry import Scraper
 
-class Nginx:
-    def __init__(self):
+# A release heading in CHANGES, e.g. "Changes with nginx 1.29.0     24 Jun 2025"
+CHANGES_HEADING = re.compile(r'Changes with nginx (\d+)\.(\d+)\.(\d+)')
+
+class Nginx(Scraper):
+    name = "nginx"
+
+    def __init__(self, client=None):
+        super().__init__(client)
         self.url = "https://nginx.org/en/download.html"
         self.change_log = "https://nginx.org/en/CHANGES"
         self.min_version = (1, 20, 1)  # Minimum version: 1.11.8
 
+    def run(self, **options):
+        return self.show_download(**options)
+
     def parse_version(self, text):
         """Extract version number from changelog text"""
         match = re.search(r'Changes with nginx (\d+)\.(\d+)\.(\d+)', text)
@@ -29,22 +38,30 @@ class Nginx:
         # Blacklist versions below 1.20.1
         return not self.compare_versions(version, self.min_version)
 
-    def changelog_version(self):
-        res = httpx.get(self.change_log)
-        soup = BeautifulSoup(res.text, "html.parser")
-        text = soup.get_text()
-        
-        # Find all version patterns in the changelog
-        version_pattern = r'Changes with nginx (\d+\.\d+\.\d+)'
-        matches = re.findall(version_pattern, text)
-        
+    def changelog_version(self, text=None):
+        """
+        Return the versions in CHANGES that are not below ``min_version``.
+
+        CHANGES is plain text listing releases newest first, so it is streamed
+        line by line and reading stops at the first release below the minimum.
+        ``text`` may be given instead of fetching it (for testing).
+        """
+        if text is not None:
+            return self.scan_changes(text.splitlines())
+        with closing(stream_lines(self.change_log, self.client)) as lines:
+            return self.scan_changes(lines)
+
+    def scan_changes(self, lines):
+        """Collect release versions from CHANGES lines until one is below ``min_version``."""
         versions = []
-        for version_str in matches:
-            # Create a fake changelog line to test with blacklist
-            test_line = f"Changes with nginx {version_str}"
-            if not self.blacklist_version(test_line):
-                versions.append(version_str)
-        
+        for line in lines:
+            match = CHANGES_HEADING.match(line)
+            if not match:
+                continue
+            version = tuple(int(part) for part in match.groups())
+            if not self.compare_versions(version, self.min_version):
+                break
+            versions.append(".".join(match.groups()))
         return versions
     
     
@@ -53,54 +70,37 @@ class Nginx:
         versions = self.changelog_version()
         
         # Sort versions in descending order
-        sorted_versions = sorted(versions, key=VersionHandling.version_key, reverse=True)
-        
-        # Create data for each OS
-        os_data = []
-        
-        # Windows data
-        windows_data = []
-        for version in sorted_versions:
-            windows_data.append({
-                "version": version,
-                "gpg": f"https://nginx.org/download/nginx-{version}.zip.asc",
-                "link": f"https://nginx.org/download/nginx-{version}.zip"
-            })
-        os_data.append({"os": "Windows", "data": windows_data})
-        
-        # Linux data
-        linux_data = []
-        for version in sorted_versions:
-            linux_data.append({
-                "version": version,
-                "gpg": f"https://nginx.org/download/nginx-{version}.tar.gz.asc",
-                "link": f"https://nginx.org/download/nginx-{version}.tar.gz"
-            })
-        os_data.append({"os": "Linux", "data": linux_data})
+        sorted_versions = sort_versions(versions)
         
-        # macOS data
-        macos_data = []
+        # Windows gets the zip build, Linux and macOS share the source tarball
+        releases = []
         for version in sorted_versions:
-            macos_data.append({
-                "version": version,
-                "gpg": f"https://nginx.org/download/nginx-{version}.tar.gz.asc",
-                "link": f"https://nginx.org/download/nginx-{version}.tar.gz"
-            })
-        os_data.append({"os": "macOS", "data": macos_data})
+            releases.append(Release(
+                version,
+                f"https://nginx.org/download/nginx-{version}.zip",
+                os=("Windows",),
+                gpg=f"https://nginx.org/download/nginx-{version}.zip.asc",
+            ))
+            releases.append(Release(
+                version,
+                f"https://nginx.org/download/nginx-{version}.tar.gz",
+                os=("Linux", "macOS"),
+                gpg=f"https://nginx.org/download/nginx-{version}.tar.gz.asc",
+            ))
         
-        return {"nginx": os_data}
+        return serialize_releases("nginx", releases)
 
     
 if __name__ == "__main__":
+    import catalog
     import json
     
     nginx = Nginx()
     result = nginx.show_download()
     print(nginx.changelog_version())
     
-    # Save to JSON file like mysql.py does
-    with open("assets/nginx.json", "w", encoding="utf-8") as f:
-        json.dump(result, f, indent=2, ensure_ascii=False)
+    # Written atomically, and merged into assets/catalog.json
+    catalog.publish(result, "nginx.json")
     
     print("Saved all Nginx download info to assets/nginx.json")
     print(json.dumps(result, indent=2, ensure_ascii=False))
@@ -1,17 +1,40 @@
-
+import concurrent.futures
+import logging
 import httpx
-from utils import SimpleVersion
+from contextlib import closing
+from utils import Release, SimpleVersion, iter_json_array, serialize_releases, stream_text
+from registry import Scraper
+
+# OS -> the dist/index.json "files" key the crafted download belongs to
+INDEX_FILES = {"Windows": "win-x64-zip", "Linux": "linux-x64", "macOS": "osx-arm64-tar"}
+
+
+class NodeScrape(Scraper):
+    name = "nodejs"
 
-class NodeScrape:
-    def __init__(self):
+    def __init__(self, client=None):
+        super().__init__(client)
         self.json_release = "https://nodejs.org/dist/index.json"
         self.min_version = SimpleVersion("18.0.0")
+        # Release metadata ({"version", "date", "lts", "files"}) of the last scrape
+        self.index = []
+
+    def run(self, **options):
+        return self.scrape_version(**options)
 
     @staticmethod
-    def crafted_file_entries(version_str):
+    def crafted_file_entries(version_str, files=None):
+        """
+        Return the downloads of a release for each OS.
+
+        Args:
+            version_str: A version without the "v" prefix, e.g. "22.18.0"
+            files: The "files" list of the release in dist/index.json; when
+                given, only downloads it actually lists are returned
+        """
         base_url = f"https://nodejs.org/dist/v{version_str}"
         gpg_url = f"{base_url}/SHASUMS256.txt.asc"
-        files = [
+        entries = [
             {
                 "os": "Linux",
                 "arch": "x64",
@@ -34,72 +57,106 @@ class NodeScrape:
                 "gpg": gpg_url
             }
         ]
-        # Not all versions have all files, but for simplicity, always include these entries
-        return files
-    
-    def scrape_version(self):
+        if files is None:
+            return entries
+        return [entry for entry in entries if INDEX_FILES[entry["os"]] in files]
+
+    def shasums(self, version_str):
+        """Return ``{file name: sha256}`` from the SHASUMS256.txt manifest of a release."""
+        response = self.client.get(f"https://nodejs.org/dist/v{version_str}/SHASUMS256.txt")
+        response.raise_for_status()
+        sums = {}
+        for line in response.text.splitlines():
+            digest, _, name = line.strip().partition(" ")
+            name = name.strip().lstrip("*")
+            if digest and name:
+                sums[name] = digest
+        return sums
+
+    def release_shasums(self, versions, max_workers=8):
+        """
+        Fetch the SHASUMS256.txt manifest of each version once, on a thread pool.
+
+        Returns ``{version: {file name: sha256}}``; a version whose manifest
+        cannot be fetched is logged and maps to an empty dict.
+        """
+        import contextvars
+
+        manifests = {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # Workers run in a copy of the caller's context to keep its metrics labels
+            futures = {executor.submit(contextvars.copy_context().run, self.shasums, version): version
+                       for version in versions}
+            for future in concurrent.futures.as_completed(futures):
+                version = futures[future]
+                try:
+                    manifests[version] = future.result()
+                except httpx.HTTPError as e:
+                    logging.warning(f"No SHASUMS256.txt for Node.js {version}: {e}")
+                    manifests[version] = {}
+        return manifests
+
+    def iter_index(self, items):
+        """
+        Yield the metadata of releases from dist/index.json items, newest first.
+
+        The index is sorted by version in descending order, so iteration stops
+        at the first release below ``min_version``.
+        """
+        for item in items:
+            ver = item['version'].replace('v', '')
+            if not SimpleVersion(ver) >= self.min_version:
+                break
+            yield {
+                "version": ver,
+                "date": item.get("date", ""),
+                "lts": item.get("lts", False),
+                "files": item.get("files"),
+            }
+
+    def scrape_version(self, data=None, checksums=True):
+        """
+        Return the ``{"nodejs": [...]}`` downloads of every release since ``min_version``.
+
+        The index is streamed and decoded item by item, and the download stops
+        as soon as the releases fall below ``min_version``. With the HTTP cache
+        on, an index read only partly that way is not stored, so the next run
+        downloads it again instead of revalidating it; an entry already cached
+        is still revalidated and read from disk. ``data`` may be
+        given instead of fetching the index (for testing). With ``checksums``,
+        each download carries its SHA-256 from the release's SHASUMS256.txt.
+        """
         try:
-            response = httpx.get(self.json_release)
-            response.raise_for_status()
-            data = response.json()
+            if data is not None:
+                self.index = list(self.iter_index(data))
+            else:
+                with closing(stream_text(self.json_release, self.client)) as chunks:
+                    self.index = list(self.iter_index(iter_json_array(chunks)))
         except httpx.RequestError as e:
             print(f"An error occurred while fetching the data: {e}")
             return {}
 
-        # Collect all versions that meet the minimum version requirement
-        versions = []
-        for item in data:
-            ver = item['version'].replace('v', '')
-            if SimpleVersion(ver) >= self.min_version:
-                versions.append(ver)
-        
-        # Create data for each OS
-        os_data = []
-        
-        # Windows data
-        windows_data = []
-        for ver in versions:
-            base_url = f"https://nodejs.org/dist/v{ver}"
-            windows_data.append({
-                "version": ver,
-                "gpg": f"{base_url}/SHASUMS256.txt.asc",
-                "link": f"{base_url}/node-v{ver}-win-x64.zip"
-            })
-        os_data.append({"os": "Windows", "data": windows_data})
-        
-        # Linux data
-        linux_data = []
-        for ver in versions:
-            base_url = f"https://nodejs.org/dist/v{ver}"
-            linux_data.append({
-                "version": ver,
-                "gpg": f"{base_url}/SHASUMS256.txt.asc",
-                "link": f"{base_url}/node-v{ver}-linux-x64.tar.xz"
-            })
-        os_data.append({"os": "Linux", "data": linux_data})
-        
-        # macOS data
-        macos_data = []
-        for ver in versions:
-            base_url = f"https://nodejs.org/dist/v{ver}"
-            macos_data.append({
-                "version": ver,
-                "gpg": f"{base_url}/SHASUMS256.txt.asc",
-                "link": f"{base_url}/node-v{ver}-darwin-arm64.tar.xz"
-            })
-        os_data.append({"os": "macOS", "data": macos_data})
-        
-        return {"nodejs": os_data}
+        manifests = self.release_shasums([release["version"] for release in self.index]) if checksums else {}
+
+        # Create data for each OS, only with the files each release lists
+        releases = []
+        for release in self.index:
+            sums = manifests.get(release["version"], {})
+            for entry in self.crafted_file_entries(release["version"], release["files"]):
+                digest = sums.get(entry["link"].rsplit("/", 1)[1])
+                releases.append(Release(release["version"], entry["link"], os=(entry["os"],), arch=entry["arch"],
+                                        gpg=entry["gpg"], checksum=f"sha256:{digest}" if digest else ""))
+        return serialize_releases("nodejs", releases, os_names=tuple(INDEX_FILES))
 
 if __name__ == "__main__":
+    import catalog
     import json
-    
+
     scraper = NodeScrape()
     result = scraper.scrape_version()
-    
-    # Save to JSON file like mysql.py does
-    with open("assets/nodejs.json", "w", encoding="utf-8") as f:
-        json.dump(result, f, indent=2, ensure_ascii=False)
-    
+
+    # Written atomically, and merged into assets/catalog.json
+    catalog.publish(result, "nodejs.json")
+
     print("Saved all Node.js download info to assets/nodejs.json")
-    print(json.dumps(result, indent=2, ensure_ascii=False))
\ No newline at end of file
+    print(json.dumps(result, indent=2, ensure_ascii=False))
@@ -1,17 +1,26 @@
-import httpx
 import re
-from bs4 import BeautifulSoup
+from bs4 import SoupStrainer
 
-from utils import VersionHandling
+from utils import Release, make_soup, serialize_releases, sort_versions
+from registry import Scraper
 
+# Every release lives in its own <div class="block">
+RELEASE_BLOCKS = SoupStrainer("div", class_="block")
 
-class PhpWinScrape:
-    def __init__(self):
+
+class PhpWinScrape(Scraper):
+    name = "php"
+
+    def __init__(self, client=None):
+        super().__init__(client)
         self.php_url = "https://windows.php.net/download/"
         self.php_min_version = "8.1.0"
 
+    def run(self, **options):
+        return self.scraper(**options)
+
     def scraper(self):
-        bs = BeautifulSoup(httpx.get(self.php_url).text, "html.parser")
+        bs = make_soup(self.client.get(self.php_url).text, RELEASE_BLOCKS)
         versions_data = []
         
         for h3 in bs.find_all("h3", class_="summary entry-title"):
@@ -24,15 +33,12 @@ class PhpWinScrape:
                 continue
             
             # Find both thread-safe and non-thread-safe builds for this version
-            builds_found = []
             for innerbox in block.find_all("div", class_="innerbox"):
                 h4 = innerbox.find("h4")
                 if not h4:
                     continue
                 build_title = h4.text.strip()
-                vs = "vs17" if "vs17" in build_title.lower() else ("vs16" if "vs16" in build_title.lower() else None)
                 arch = "x64" if "x64" in build_title.lower() else ("x86" if "x86" in build_title.lower() else None)
-                nts = True if "non thread safe" in build_title.lower() else False
                 
                 # Look for Release zip files
                 for a in innerbox.find_all("a"):
@@ -45,41 +51,15 @@ class PhpWinScrape:
                             link = "https://windows.php.net" + link
                         # Collect x64 builds (both thread-safe and non-thread-safe)
                         if arch == "x64":
-                            builds_found.append({
-                                "link": link,
-                                "nts": nts,
-                                "vs": vs
-                            })
+                            # PHP Windows builds don't provide GPG signatures
+                            versions_data.append(Release(version, link, os=("Windows",), arch=arch))
                             break
-            
-            # Add all found builds for this version
-            for build in builds_found:
-                versions_data.append({
-                    "version": version,
-                    "link": build["link"]
-                })
         
         # Sort versions in descending order
-        def version_key(item):
-            v = item["version"]
-            return VersionHandling.version_key(v)
-        
-        sorted_versions = sorted(versions_data, key=version_key, reverse=True)
+        sorted_versions = sort_versions(versions_data, key=lambda build: build.version)
         
         # Create data for Windows only
-        os_data = []
-        
-        # Windows data (from scraped data)
-        windows_data = []
-        for item in sorted_versions:
-            windows_data.append({
-                "version": item["version"],
-                "gpg": "",  # PHP Windows builds don't provide GPG signatures
-                "link": item["link"]
-            })
-        os_data.append({"os": "Windows", "data": windows_data})
-        
-        return {"php": os_data}
+        return serialize_releases("php", sorted_versions, os_names=("Windows",))
 
     @staticmethod
     def filter_version(label):
@@ -95,14 +75,14 @@ class PhpWinScrape:
         return True
 
 if __name__ == "__main__":
+    import catalog
     import json
     
     scraper = PhpWinScrape()
     result = scraper.scraper()
     
-    # Save to JSON file like mysql.py does
-    with open("assets/php.json", "w", encoding="utf-8") as f:
-        json.dump(result, f, indent=2, ensure_ascii=False)
+    # Written atomically, and merged into assets/catalog.json
+    catalog.publish(result, "php.json")
     
     print("Saved all PHP download info to assets/php.json")
     print(json.dumps(result, indent=2, ensure_ascii=False))
\ No newline at end of file
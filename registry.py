@@ -0,0 +1,75 @@
+"""Registry of the product scrapers, resolved by name without importing them.
+
+Only the module and class names are listed here; a scraper's module (and
+with it httpx, BeautifulSoup, ...) is imported the first time that scraper
+is asked for, so listing products or running a single one stays cheap.
+"""
+import importlib
+from collections import namedtuple
+
+# module, class_name: where the Scraper subclass lives
+# output: the asset shard it is saved to
+# host: the upstream host it mostly talks to, None when it fetches nothing
+ScraperSpec = namedtuple("ScraperSpec", ("module", "class_name", "output", "host"))
+
+SCRAPERS = {
+    "mysql": ScraperSpec("mysql", "MysqlScrape", "database.json", "downloads.mysql.com"),
+    "apache": ScraperSpec("apache", "ApacheScrape", "apache.json", "archive.apache.org"),
+    "nginx": ScraperSpec("nginx", "Nginx", "nginx.json", "nginx.org"),
+    "nodejs": ScraperSpec("nodejs", "NodeScrape", "nodejs.json", "nodejs.org"),
+    "php": ScraperSpec("php", "PhpWinScrape", "php.json", "windows.php.net"),
+    "composer": ScraperSpec("composer", "ComposerScrape", "composer.json", "getcomposer.org"),
+    "heidisql": ScraperSpec("heldisql", "HeldiSqlScrape", "heldisql.json", "www.heidisql.com"),
+    "phpmyadmin": ScraperSpec("phpmyadmin", "PhpMyAdminScrape", "phpmyadmin.json", None),
+}
+
+
+class Scraper:
+    """
+    Base class of the product scrapers.
+
+    Subclasses set ``name`` to their registry name (also the top-level key
+    of their asset data) and implement ``run``. The HTTP client is only
+    looked up on first use, so building a scraper never touches httpx.
+    """
+
+    name = None
+
+    def __init__(self, client=None):
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            from utils import shared_client
+
+            self._client = shared_client()
+        return self._client
+
+    @client.setter
+    def client(self, client):
+        self._client = client
+
+    def run(self, **options):
+        """Scrape upstream and return the ``{name: [{"os": ..., "data": [...]}]}`` asset data."""
+        raise NotImplementedError
+
+
+def names():
+    return list(SCRAPERS)
+
+
+def scraper_class(name):
+    """Import and return the scraper class registered as ``name``."""
+    spec = SCRAPERS[name]
+    return getattr(importlib.import_module(spec.module), spec.class_name)
+
+
+def create(name, client=None):
+    """Build the scraper registered as ``name``."""
+    return scraper_class(name)(client)
+
+
+def run(name, **options):
+    """Build and run the scraper registered as ``name``, returning its asset data."""
+    return create(name).run(**options)
@@ -0,0 +1,152 @@
+"""Refresh each product on its own schedule.
+
+    python -m entydata schedule           # run forever, refreshing whatever is due
+    python -m entydata schedule --once    # refresh what is due now and exit (for cron)
+
+Upstreams change at very different rates, so every product has its own
+interval (``INTERVALS``). A finished run is next due one interval later,
+give or take ``jitter`` of it so products do not settle into refreshing at
+the same moment; a failed run is retried after an exponential backoff
+instead. Products due at the same time are refreshed together, concurrently.
+The last run of every product is kept in a JSON state file, so a restart
+does not scrape everything again.
+"""
+import json
+import logging
+import os
+import random
+import time
+
+import catalog
+
+STATE_FILE = os.path.join(".cache", "schedule.json")
+
+HOUR = 3600
+DAY = 24 * HOUR
+# name -> seconds between refreshes
+INTERVALS = {
+    # Releases every week or so, plus security releases
+    "nodejs": DAY,
+    "mysql": DAY,
+    "php": DAY,
+    # A few releases a month or less
+    "apache": 7 * DAY,
+    "nginx": 7 * DAY,
+    "composer": 7 * DAY,
+    "heidisql": 7 * DAY,
+    # A list in the code; only changes with a new EntyData release
+    "phpmyadmin": 30 * DAY,
+}
+DEFAULT_INTERVAL = DAY
+
+
+class Scheduler:
+    """
+    Decide which products are due and record how their runs went.
+
+    ``run`` is called with a list of due product names and returns
+    ``{name: result}``, where a result that is an exception marks a failed
+    run (``entydata.refresh`` returns exactly that).
+    """
+
+    def __init__(self, names, run, state_path=STATE_FILE, intervals=None, jitter=0.1, backoff=5 * 60,
+                 max_backoff=None, clock=time.time, rng=None):
+        """
+        Args:
+            names: Products to schedule
+            run: Callable refreshing a list of products, see above
+            state_path: JSON file the last runs are kept in
+            intervals: name -> seconds, overriding ``INTERVALS``
+            jitter: Fraction of the interval (or backoff) added or taken at random
+            backoff: Seconds before the first retry of a failed product, doubled per failure
+            max_backoff: Longest retry delay (default: the product's interval)
+            clock: Returns the current time in seconds
+            rng: ``random.Random`` used for the jitter
+        """
+        self.names = list(names)
+        self.run = run
+        self.state_path = state_path
+        self.intervals = {**INTERVALS, **(intervals or {})}
+        self.jitter = jitter
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.clock = clock
+        self.rng = rng or random.Random()
+        self.state = self.load()
+
+    def load(self):
+        """Return the saved ``{name: state}``, or nothing when there is no usable state file."""
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return state if isinstance(state, dict) else {}
+
+    def save(self):
+        catalog.write_atomic(self.state_path,
+                             json.dumps(self.state, indent=2, sort_keys=True).encode("utf-8"))
+
+    def interval(self, name):
+        return self.intervals.get(name, DEFAULT_INTERVAL)
+
+    def next_run(self, name):
+        """Time ``name`` is due at; products never run are due right away."""
+        return self.state.get(name, {}).get("next_run", 0.0)
+
+    def due(self, now=None):
+        now = self.clock() if now is None else now
+        return [name for name in self.names if self.next_run(name) <= now]
+
+    def _jittered(self, seconds):
+        return seconds * (1 + self.rng.uniform(-self.jitter, self.jitter))
+
+    def record(self, name, result, started, finished):
+        """Update the state of ``name`` after a run and schedule its next one."""
+        state = self.state.setdefault(name, {})
+        state["last_run"] = started
+        state["duration"] = round(finished - started, 3)
+        if isinstance(result, BaseException):
+            failures = state.get("failures", 0) + 1
+            max_backoff = self.max_backoff if self.max_backoff is not None else self.interval(name)
+            delay = min(self.backoff * 2 ** (failures - 1), max_backoff)
+            state.update(failures=failures, last_error=f"{type(result).__name__}: {result}")
+            logging.warning(f"{name} failed {failures} time(s) in a row, retrying in {delay:.0f}s: {result}")
+        else:
+            delay = self.interval(name)
+            state["last_success"] = finished
+            state.pop("failures", None)
+            state.pop("last_error", None)
+        state["next_run"] = finished + self._jittered(delay)
+
+    def run_due(self):
+        """Refresh every product that is due, together, and save the state. Returns ``{name: result}``."""
+        names = self.due()
+        if not names:
+            return {}
+        logging.info(f"Due: {', '.join(names)}")
+        started = self.clock()
+        try:
+            results = self.run(names)
+        except Exception as e:
+            results = {name: e for name in names}
+        finished = self.clock()
+        for name in names:
+            self.record(name, results.get(name, RuntimeError("not run")), started, finished)
+        self.save()
+        return results
+
+    def wait_time(self, now=None):
+        """Seconds until the next product is due (0 when one is due already)."""
+        now = self.clock() if now is None else now
+        return max(0.0, min(self.next_run(name) for name in self.names) - now) if self.names else None
+
+    def run_forever(self, sleep=time.sleep, max_sleep=HOUR):
+        """Run due products as they fall due, checking again at least every ``max_sleep`` seconds."""
+        while True:
+            self.run_due()
+            wait = self.wait_time()
+            if wait is None:
+                return
+            logging.info(f"Next refresh in {wait:.0f}s")
+            sleep(min(wait, max_sleep))
@@ -0,0 +1,288 @@
+"""Serve the merged catalog over HTTP from memory.
+
+    python -m entydata serve                          # http://127.0.0.1:8080/
+    python -m entydata serve --refresh-every 21600    # and re-scrape every 6 hours
+
+Endpoints (GET or HEAD, JSON):
+
+    /catalog                           the whole catalog document
+    /catalog?since=<revision>          what changed since a revision, see catalog.delta_since
+    /products                          {product: [OS names]}
+    /products/<product>                {product: [groups]}, like assets/<product>.json
+    /products/<product>/<os>           {"os": ..., "data": [...]}
+    /products/<product>/<os>/latest    the newest entry, ?series=8.0 for the newest 8.0.x
+
+Every body is encoded, compressed (gzip, and brotli when the ``brotli``
+package is installed) and given a strong ETag once per catalog, so a request
+only picks bytes that are already there, and a poll with ``If-None-Match``
+gets a bodyless 304. A client that already holds revision N asks for
+``/catalog?since=N`` and gets a delta (``{"from", "to", "hash", "added",
+"removed", "order", "groups"}``, see ``catalog.diff_products``) to patch its
+copy with ``utils.apply_delta``; when the deltas kept do not reach back to N
+it gets the whole catalog instead (it has ``"products"``). The deltas are
+those of ``catalog.json`` even when ``--catalog`` names one of its compact
+variants.
+
+When the catalog changes on disk, by a background refresh or any other
+writer, the new catalog is prepared off to the side and swapped in with a
+single assignment: requests see the old or the new catalog, never a mix.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import namedtuple
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import catalog
+from utils import load_catalog
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+CATALOG_PATH = os.path.join(catalog.ASSETS_DIR, catalog.CATALOG_FILE)
+# Answers to ?series= queries kept per catalog; further series are answered without being kept
+MAX_SERIES_BODIES = 1024
+
+# body: the identity encoding; encoded: content coding -> compressed bytes, only those smaller than body
+Body = namedtuple("Body", ("status", "body", "encoded", "etag"))
+
+
+def encode(value, status=HTTPStatus.OK):
+    """Serialize ``value`` once and prepare its compressed forms and strong ETag."""
+    body = json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    encoded = {"gzip": gzip.compress(body, 9, mtime=0)}
+    if brotli is not None:
+        encoded["br"] = brotli.compress(body, quality=11)
+    encoded = {coding: data for coding, data in encoded.items() if len(data) < len(body)}
+    return Body(status, body, encoded, hashlib.sha256(body).hexdigest()[:32])
+
+
+def not_found(message):
+    return encode({"error": message}, HTTPStatus.NOT_FOUND)
+
+
+def accepted_codings(header):
+    """Return the content codings an ``Accept-Encoding`` header allows (q > 0)."""
+    codings = set()
+    for item in (header or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            codings.add(coding.strip().lower())
+    return codings
+
+
+class Snapshot:
+    """One catalog with every response body precomputed, replaced as a whole when the catalog changes."""
+
+    def __init__(self, document, deltas=()):
+        self.document = document
+        self.hash = document["hash"]
+        self.revision = document.get("revision")
+        self.index = catalog.Catalog(document)
+        products = document["products"]
+        self.routes = {
+            ("catalog",): encode(document),
+            ("products",): encode({name: [group["os"] for group in groups] for name, groups in products.items()}),
+        }
+        for name, groups in products.items():
+            self.routes[("products", name)] = encode({name: groups})
+            for group in groups:
+                self.routes[("products", name, group["os"])] = encode(group)
+                self.routes[("products", name, group["os"], "latest")] = self._latest(name, group["os"], None)
+        self._series = {}
+        # since revision -> delta body; deltas not ending at this catalog's revision are of no use
+        deltas = list(deltas) if deltas and deltas[-1]["to"] == self.revision else []
+        self.deltas = {}
+        for since in [delta["from"] for delta in deltas]:
+            delta = catalog.delta_since(deltas, since)
+            if delta is not None:
+                self.deltas[str(since)] = encode(delta)
+        if self.revision is not None:
+            self.deltas[str(self.revision)] = encode(
+                {"from": self.revision, "to": self.revision, "hash": self.hash, "added": [], "removed": [],
+                 "order": [], "groups": []})
+
+    def _latest(self, product, os_name, series):
+        entry = self.index.latest(product, os_name, series)
+        if entry is None:
+            return not_found(f"no {product} release for {os_name}" + (f" in series {series}" if series else ""))
+        return encode(entry)
+
+    def lookup(self, parts, query):
+        """Return the ``Body`` answering the path ``parts`` and parsed ``query``."""
+        since = query.get("since", [None])[0]
+        if since is not None and parts == ("catalog",):
+            # Unknown or too old revisions get the whole catalog
+            return self.deltas.get(since, self.routes[parts])
+        series = query.get("series", [None])[0]
+        if series and len(parts) == 4 and parts[3] == "latest" and parts[:3] in self.routes:
+            key = (parts[1], parts[2], series)
+            body = self._series.get(key)
+            if body is None:
+                body = self._latest(*key)
+                if len(self._series) < MAX_SERIES_BODIES:
+                    self._series[key] = body
+            return body
+        body = self.routes.get(parts)
+        if body is None:
+            return not_found(f"no such resource: /{'/'.join(parts)}")
+        return body
+
+
+class CatalogHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "EntyData"
+    # Headers and body are separate writes; with Nagle on, keep-alive clients wait for delayed ACKs
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.respond(head=False)
+
+    def do_HEAD(self):
+        self.respond(head=True)
+
+    def respond(self, head):
+        # Read once: a swap during this request does not mix two catalogs
+        snapshot = self.server.snapshot
+        url = urlsplit(self.path)
+        parts = tuple(unquote(part) for part in url.path.split("/") if part)
+        body = snapshot.lookup(parts, parse_qs(url.query))
+
+        codings = accepted_codings(self.headers.get("Accept-Encoding"))
+        coding = next((coding for coding in ("br", "gzip") if coding in codings and coding in body.encoded), None)
+        etag = f'"{body.etag}-{coding}"' if coding else f'"{body.etag}"'
+        payload = body.encoded[coding] if coding else body.body
+
+        if body.status == HTTPStatus.OK and self.not_modified(etag):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", etag)
+            self.send_header("Vary", "Accept-Encoding")
+            self.end_headers()
+            return
+        self.send_response(body.status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        if coding:
+            self.send_header("Content-Encoding", coding)
+        self.send_header("Vary", "Accept-Encoding")
+        if body.status == HTTPStatus.OK:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        if not head:
+            self.wfile.write(payload)
+
+    def not_modified(self, etag):
+        header = self.headers.get("If-None-Match")
+        if not header:
+            return False
+        if header.strip() == "*":
+            return True
+        # If-None-Match uses the weak comparison
+        return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+    def log_message(self, format, *args):
+        logging.debug(f"{self.address_string()} {format % args}")
+
+
+class CatalogServer(ThreadingHTTPServer):
+    """``ThreadingHTTPServer`` answering from the ``Snapshot`` of the catalog at ``path``."""
+
+    daemon_threads = True
+
+    def __init__(self, address, path=CATALOG_PATH):
+        self.catalog_path = path
+        self._stat = None
+        self._reload_lock = threading.Lock()
+        self.snapshot = None
+        if not self.reload():
+            raise FileNotFoundError(f"No catalog at {path}, run `python -m entydata refresh` first")
+        super().__init__(address, CatalogHandler)
+
+    def reload(self, force=False):
+        """
+        Load the catalog again if its file changed, and swap it in if its content did.
+
+        Returns True when a new snapshot is being served.
+        """
+        with self._reload_lock:
+            try:
+                stat = os.stat(self.catalog_path)
+            except OSError as e:
+                logging.warning(f"Cannot read {self.catalog_path}: {e}")
+                return False
+            key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+            if key == self._stat and not force:
+                return False
+            try:
+                document = load_catalog(self.catalog_path)
+            except (OSError, ValueError) as e:
+                logging.warning(f"Keeping the current catalog, {self.catalog_path} is unreadable: {e}")
+                return False
+            self._stat = key
+            if self.snapshot is not None and self.snapshot.hash == document.get("hash"):
+                return False
+            snapshot = Snapshot(document, catalog.read_deltas(self.catalog_path))
+            self.snapshot = snapshot
+        logging.info(f"Serving catalog revision {snapshot.revision} ({snapshot.hash[:12]}) generated at "
+                     f"{document.get('generated_at')}")
+        return True
+
+
+def watch(server, stop, interval):
+    """Reload the catalog whenever its file changes, checking every ``interval`` seconds."""
+    while not stop.wait(interval):
+        server.reload()
+
+
+def refresh_forever(server, stop, interval, names, assets_dir):
+    """Re-scrape ``names`` every ``interval`` seconds and serve the result as soon as it is written."""
+    import asyncio
+
+    import entydata
+
+    names = names or list(entydata.SCRAPERS)
+    while not stop.wait(interval):
+        try:
+            results = asyncio.run(entydata.refresh(names, assets_dir=assets_dir))
+        except Exception as e:
+            logging.error(f"Background refresh failed: {e}")
+            continue
+        for name, result in results.items():
+            if isinstance(result, BaseException):
+                logging.error(f"Background refresh of {name} failed: {result}")
+        server.reload()
+
+
+def serve(host="127.0.0.1", port=8080, path=CATALOG_PATH, watch_interval=5.0, refresh_interval=None, names=None):
+    """Serve the catalog at ``path`` until interrupted, optionally refreshing ``names`` in the background."""
+    server = CatalogServer((host, port), path)
+    stop = threading.Event()
+    threads = [threading.Thread(target=watch, args=(server, stop, watch_interval), name="catalog-watch", daemon=True)]
+    if refresh_interval:
+        threads.append(threading.Thread(target=refresh_forever, name="catalog-refresh", daemon=True,
+                                        args=(server, stop, refresh_interval, names, os.path.dirname(path))))
+    for thread in threads:
+        thread.start()
+    logging.info(f"Listening on http://{host}:{server.server_port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
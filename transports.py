@@ -0,0 +1,770 @@
+"""httpx transports layered under the shared scraper client."""
+import base64
+import collections
+import gzip
+import hashlib
+import json
+import asyncio
+import email.utils
+import os
+import random
+import threading
+import time
+
+import httpx
+
+import metrics
+
+
+class HttpCache:
+    """
+    On-disk store of GET response bodies plus their ``ETag``/``Last-Modified`` validators.
+
+    Each entry is a ``<key>.body`` file holding the raw (still content-encoded)
+    body and a ``<key>.json`` file with the status, headers and store time.
+    Entries are touched whenever they are used, and the least recently used
+    ones are evicted once the bodies take more than ``max_bytes`` on disk.
+    """
+
+    def __init__(self, directory, max_bytes=200 * 1024 * 1024, max_age=None):
+        """
+        Args:
+            directory: Where entries are stored, created if missing
+            max_bytes: Size bound of all stored bodies
+            max_age: Seconds an entry is served without asking upstream at all
+                (default: always revalidate with a conditional request)
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        # Running size of the stored bodies, seeded by one scan on the first store
+        self._size = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, url, suffix):
+        key = hashlib.sha256(str(url).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, key + suffix)
+
+    def lookup(self, url):
+        """Return the stored entry for ``url`` as a dict (with its ``body``), or None."""
+        meta_path = self._path(url, ".json")
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            with open(self._path(url, ".body"), "rb") as f:
+                entry["body"] = f.read()
+            os.utime(meta_path)
+        except (OSError, ValueError):
+            return None
+        return entry
+
+    def is_fresh(self, entry):
+        return self.max_age is not None and time.time() - entry["stored_at"] < self.max_age
+
+    @staticmethod
+    def conditional_headers(entry):
+        """Return the ``If-None-Match``/``If-Modified-Since`` headers to revalidate ``entry``."""
+        headers = {}
+        validators = dict((k.lower(), v) for k, v in entry["headers"])
+        if "etag" in validators:
+            headers["If-None-Match"] = validators["etag"]
+        if "last-modified" in validators:
+            headers["If-Modified-Since"] = validators["last-modified"]
+        return headers
+
+    def _scan(self):
+        """Return ``(last used, meta path, body path, size)`` of every entry and their total size."""
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            meta_path = os.path.join(self.directory, name)
+            body_path = meta_path[:-len(".json")] + ".body"
+            try:
+                size = os.path.getsize(body_path)
+                used = os.path.getmtime(meta_path)
+            except OSError:
+                continue
+            entries.append((used, meta_path, body_path, size))
+            total += size
+        return entries, total
+
+    def store(self, url, status_code, headers, body):
+        """Store a response body and evict old entries if the cache grew too big."""
+        entry = {"url": str(url), "status": status_code, "headers": list(headers), "stored_at": time.time()}
+        body_path = self._path(url, ".body")
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan()[1]
+            try:
+                replaced = os.path.getsize(body_path)
+            except OSError:
+                replaced = 0
+            self._size += len(body) - replaced
+            full = self._size > self.max_bytes
+        self._write(body_path, body)
+        self._write(self._path(url, ".json"), json.dumps(entry).encode("utf-8"))
+        # The directory is only listed again when the running total says it is over the bound
+        if full:
+            self.evict()
+        entry["body"] = body
+        return entry
+
+    def refresh(self, url, entry, headers):
+        """Mark ``entry`` as revalidated by a 304, merging the validators it carried."""
+        updated = dict((k.lower(), (k, v)) for k, v in entry["headers"])
+        for key, value in headers:
+            if key.lower() in ("etag", "last-modified", "date", "cache-control", "expires"):
+                updated[key.lower()] = (key, value)
+        entry = dict(entry, headers=list(updated.values()), stored_at=time.time())
+        body = entry.pop("body")
+        self._write(self._path(url, ".json"), json.dumps(entry).encode("utf-8"))
+        entry["body"] = body
+        return entry
+
+    def evict(self):
+        """
+        Remove least recently used entries until the bodies fit in ``max_bytes``.
+
+        Eviction goes down to 90% of the bound, so a full cache is scanned
+        once per tenth of its size stored, not on every store.
+        """
+        with self._lock:
+            entries, total = self._scan()
+            low_water = self.max_bytes * 0.9 if total > self.max_bytes else self.max_bytes
+            for _, meta_path, body_path, size in sorted(entries):
+                if total <= low_water:
+                    break
+                for path in (meta_path, body_path):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                total -= size
+            self._size = total
+
+    def tee(self, request, response):
+        """Return ``response`` with a body that is stored for ``request`` once it has been read to the end."""
+        headers = response.headers.multi_items()
+
+        def store(body):
+            self.store(request.url, response.status_code, headers, body)
+
+        return httpx.Response(response.status_code, headers=headers, stream=_TeeStream(response.stream, store),
+                              request=request, extensions=response.extensions)
+
+    def response(self, entry, request, revalidated=False):
+        """Build a 200 response for ``request`` from a stored entry, ``revalidated`` when a 304 confirmed it."""
+        return httpx.Response(
+            entry["status"],
+            headers=entry["headers"],
+            stream=httpx.ByteStream(entry["body"]),
+            request=request,
+            extensions={"from_cache": True, "revalidated": revalidated},
+        )
+
+    @staticmethod
+    def _write(path, data):
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+
+class _TeeStream(httpx.SyncByteStream, httpx.AsyncByteStream):
+    """
+    Response stream handing the whole body to ``on_complete`` once it has been read to the end.
+
+    A body closed before its end (a reader that stopped early) is dropped.
+    """
+
+    def __init__(self, stream, on_complete):
+        self.stream = stream
+        self.on_complete = on_complete
+        self.chunks = []
+
+    def __iter__(self):
+        for chunk in self.stream:
+            self.chunks.append(chunk)
+            yield chunk
+        self._complete()
+
+    async def __aiter__(self):
+        async for chunk in self.stream:
+            self.chunks.append(chunk)
+            yield chunk
+        self._complete()
+
+    def _complete(self):
+        body = b"".join(self.chunks)
+        self.chunks = []
+        self.on_complete(body)
+
+    def close(self):
+        self.chunks = []
+        self.stream.close()
+
+    async def aclose(self):
+        self.chunks = []
+        await self.stream.aclose()
+
+
+class CachingTransport(httpx.BaseTransport):
+    """
+    Serve GET requests from an ``HttpCache``, revalidating stale entries with conditional requests.
+
+    New bodies are passed on as they arrive and stored once read to the end,
+    so a reader that stops early (``utils.stream_lines``) downloads no more
+    than it reads; such a partly read body is not cached.
+    """
+
+    def __init__(self, transport, cache):
+        self.transport = transport
+        self.cache = cache
+
+    def handle_request(self, request):
+        if request.method != "GET":
+            return self.transport.handle_request(request)
+        entry = self.cache.lookup(request.url)
+        if entry is not None:
+            if self.cache.is_fresh(entry):
+                return self.cache.response(entry, request)
+            request.headers.update(self.cache.conditional_headers(entry))
+
+        response = self.transport.handle_request(request)
+        if response.status_code == 304 and entry is not None:
+            response.close()
+            return self.cache.response(self.cache.refresh(request.url, entry, response.headers.multi_items()), request,
+                                       revalidated=True)
+        if response.status_code != 200:
+            return response
+        return self.cache.tee(request, response)
+
+    def close(self):
+        self.transport.close()
+
+
+class AsyncCachingTransport(httpx.AsyncBaseTransport):
+    """Async counterpart of ``CachingTransport`` sharing the same ``HttpCache``."""
+
+    def __init__(self, transport, cache):
+        self.transport = transport
+        self.cache = cache
+
+    async def handle_async_request(self, request):
+        if request.method != "GET":
+            return await self.transport.handle_async_request(request)
+        entry = self.cache.lookup(request.url)
+        if entry is not None:
+            if self.cache.is_fresh(entry):
+                return self.cache.response(entry, request)
+            request.headers.update(self.cache.conditional_headers(entry))
+
+        response = await self.transport.handle_async_request(request)
+        if response.status_code == 304 and entry is not None:
+            await response.aclose()
+            return self.cache.response(self.cache.refresh(request.url, entry, response.headers.multi_items()), request,
+                                       revalidated=True)
+        if response.status_code != 200:
+            return response
+        return self.cache.tee(request, response)
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+# Responses worth another attempt; 429 and 503 also mean the host is throttling us
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+THROTTLE_STATUSES = frozenset({429, 503})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+class TokenBucket:
+    """
+    Per-host request rate limit of ``rate`` requests per second with bursts of ``burst``.
+
+    ``reserve`` takes a token right away, going into debt when the bucket is
+    empty, and returns how long the caller has to wait before using it, so
+    the same bucket serves threads and coroutines alike.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class AdaptiveLimit:
+    """
+    Per-host cap on requests in flight, adjusted from the responses (AIMD).
+
+    The cap starts at ``maximum``, is halved whenever the host throttles us
+    and grows back by about one per cap's worth of successful requests.
+    Threads block in ``acquire``; coroutines await ``acquire_async`` and are
+    handed a slot by ``release`` in the order they started waiting, whichever
+    thread or event loop they run on.
+    """
+
+    def __init__(self, maximum, minimum=1):
+        self.maximum = maximum
+        self.minimum = minimum
+        self.limit = float(maximum)
+        self.active = 0
+        self._cond = threading.Condition()
+        # Futures of waiting coroutines, oldest first
+        self._waiters = collections.deque()
+
+    def acquire(self):
+        with self._cond:
+            while self.active >= int(self.limit) or self._waiters:
+                self._cond.wait()
+            self.active += 1
+
+    async def acquire_async(self):
+        with self._cond:
+            if self.active < int(self.limit) and not self._waiters:
+                self.active += 1
+                return
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            with self._cond:
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    # Handed a slot just before the cancellation: pass it on
+                    self.active -= 1
+                    self._wake()
+            raise
+
+    def release(self, throttled=False):
+        with self._cond:
+            self.active -= 1
+            if throttled:
+                self.limit = max(self.minimum, self.limit / 2)
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._wake()
+
+    def _wake(self):
+        """Hand free slots to waiting coroutines first, then let blocked threads check again."""
+        while self._waiters and self.active < int(self.limit):
+            waiter = self._waiters.popleft()
+            self.active += 1
+            try:
+                waiter.get_loop().call_soon_threadsafe(_resolve, waiter)
+            except RuntimeError:
+                # Its event loop is closed, nobody is waiting any more
+                self.active -= 1
+        self._cond.notify_all()
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class RetryPolicy:
+    """
+    How requests are retried and paced per host, shared by every client built with it.
+
+    Failed idempotent requests (transport errors and ``RETRY_STATUSES``) are
+    retried up to ``retries`` times after an exponential backoff with full
+    jitter, or after the ``Retry-After`` the server asked for. Each host gets
+    its own ``TokenBucket`` when ``rate`` is set, and its own ``AdaptiveLimit``
+    when ``max_concurrency`` is set.
+    """
+
+    def __init__(self, retries=3, backoff=0.5, max_backoff=30.0, max_retry_after=120.0,
+                 rate=None, burst=1, max_concurrency=8):
+        """
+        Args:
+            retries: Attempts after the first one
+            backoff: Base delay in seconds, doubled with every attempt
+            max_backoff: Upper bound of the backoff delay
+            max_retry_after: Longest ``Retry-After`` honoured; a longer one ends the retries
+            rate: Requests per second per host (default: unlimited)
+            burst: Requests a host may get at once before ``rate`` applies
+            max_concurrency: Upper bound of the adaptive requests in flight per host
+                (None: unbounded)
+        """
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_retry_after = max_retry_after
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self._buckets = {}
+        self._limits = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, host):
+        if self.rate is None:
+            return None
+        with self._lock:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(self.rate, self.burst)
+            return self._buckets[host]
+
+    def limit(self, host):
+        if self.max_concurrency is None:
+            return None
+        with self._lock:
+            if host not in self._limits:
+                self._limits[host] = AdaptiveLimit(self.max_concurrency)
+            return self._limits[host]
+
+    @staticmethod
+    def retry_after(response):
+        """Return the seconds the ``Retry-After`` header of ``response`` asks for, or None."""
+        value = response.headers.get("Retry-After")
+        if value is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    def delay(self, attempt, response=None):
+        """Return the seconds to wait before retry ``attempt`` (0-based), or None to give up."""
+        if attempt >= self.retries:
+            return None
+        if response is not None:
+            requested = self.retry_after(response)
+            if requested is not None:
+                if requested > self.max_retry_after:
+                    return None
+                return requested + random.uniform(0, self.backoff)
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def should_retry(self, request, response=None):
+        return request.method in IDEMPOTENT_METHODS and (response is None or response.status_code in RETRY_STATUSES)
+
+
+def _retrying(request, reason, delay):
+    host = request.url.host
+    metrics.increment("http_retries_total", host=host, reason=reason)
+    metrics.event(type="retry", method=request.method, host=host, url=str(request.url), reason=reason, delay=delay)
+
+
+class RetryTransport(httpx.BaseTransport):
+    """Retry, rate limit and adaptively cap the requests to each host following a ``RetryPolicy``."""
+
+    def __init__(self, transport, policy):
+        self.transport = transport
+        self.policy = policy
+
+    def _send(self, request):
+        host = request.url.host
+        bucket = self.policy.bucket(host)
+        if bucket is not None:
+            time.sleep(bucket.reserve())
+        limit = self.policy.limit(host)
+        if limit is None:
+            return self.transport.handle_request(request)
+        limit.acquire()
+        throttled = False
+        try:
+            response = self.transport.handle_request(request)
+            throttled = response.status_code in THROTTLE_STATUSES
+            return response
+        finally:
+            limit.release(throttled)
+
+    def handle_request(self, request):
+        attempt = 0
+        while True:
+            try:
+                response = self._send(request)
+            except httpx.TransportError as e:
+                delay = self.policy.delay(attempt) if self.policy.should_retry(request) else None
+                if delay is None:
+                    raise
+                _retrying(request, type(e).__name__, delay)
+            else:
+                delay = self.policy.delay(attempt, response) if self.policy.should_retry(request, response) else None
+                if delay is None:
+                    return response
+                response.close()
+                _retrying(request, str(response.status_code), delay)
+            time.sleep(delay)
+            attempt += 1
+
+    def close(self):
+        self.transport.close()
+
+
+class AsyncRetryTransport(httpx.AsyncBaseTransport):
+    """Async counterpart of ``RetryTransport``, sharing the per-host state of the same ``RetryPolicy``."""
+
+    def __init__(self, transport, policy):
+        self.transport = transport
+        self.policy = policy
+
+    async def _send(self, request):
+        host = request.url.host
+        bucket = self.policy.bucket(host)
+        if bucket is not None:
+            await asyncio.sleep(bucket.reserve())
+        limit = self.policy.limit(host)
+        if limit is None:
+            return await self.transport.handle_async_request(request)
+        await limit.acquire_async()
+        throttled = False
+        try:
+            response = await self.transport.handle_async_request(request)
+            throttled = response.status_code in THROTTLE_STATUSES
+            return response
+        finally:
+            limit.release(throttled)
+
+    async def handle_async_request(self, request):
+        attempt = 0
+        while True:
+            try:
+                response = await self._send(request)
+            except httpx.TransportError as e:
+                delay = self.policy.delay(attempt) if self.policy.should_retry(request) else None
+                if delay is None:
+                    raise
+                _retrying(request, type(e).__name__, delay)
+            else:
+                delay = self.policy.delay(attempt, response) if self.policy.should_retry(request, response) else None
+                if delay is None:
+                    return response
+                await response.aclose()
+                _retrying(request, str(response.status_code), delay)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+class _CountingStream(httpx.SyncByteStream, httpx.AsyncByteStream):
+    """Response stream counting the bytes read through it, reporting them once closed."""
+
+    def __init__(self, stream, on_close):
+        self.stream = stream
+        self.on_close = on_close
+        self.bytes = 0
+
+    def __iter__(self):
+        for chunk in self.stream:
+            self.bytes += len(chunk)
+            yield chunk
+
+    async def __aiter__(self):
+        async for chunk in self.stream:
+            self.bytes += len(chunk)
+            yield chunk
+
+    def _report(self):
+        if self.on_close is not None:
+            self.on_close(self.bytes)
+            self.on_close = None
+
+    def close(self):
+        try:
+            self.stream.close()
+        finally:
+            self._report()
+
+    async def aclose(self):
+        try:
+            await self.stream.aclose()
+        finally:
+            self._report()
+
+
+class TimingTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """
+    Report every request of the client to the active ``metrics`` recorder.
+
+    The wait for response headers goes to the ``fetch`` phase and, per host, to
+    the request latency histogram; cache hits, status codes and the body bytes
+    actually received from upstream are counted per host, and each request
+    ends up as one event in the recorder's log once its body is closed.
+    Without a recorder requests pass through untouched.
+    """
+
+    def __init__(self, transport):
+        self.transport = transport
+
+    def handle_request(self, request):
+        if not metrics.enabled():
+            return self.transport.handle_request(request)
+        start = time.perf_counter()
+        try:
+            with metrics.phase("fetch"):
+                response = self.transport.handle_request(request)
+        except httpx.TransportError as e:
+            self._failed(request, start, e)
+            raise
+        return self._instrument(request, response, start)
+
+    async def handle_async_request(self, request):
+        if not metrics.enabled():
+            return await self.transport.handle_async_request(request)
+        start = time.perf_counter()
+        try:
+            with metrics.phase("fetch"):
+                response = await self.transport.handle_async_request(request)
+        except httpx.TransportError as e:
+            self._failed(request, start, e)
+            raise
+        return self._instrument(request, response, start)
+
+    @staticmethod
+    def _failed(request, start, error):
+        host = request.url.host
+        metrics.increment("http_requests_total", host=host, status="error")
+        metrics.event(type="request", method=request.method, host=host, url=str(request.url),
+                      error=type(error).__name__, seconds=time.perf_counter() - start)
+
+    @staticmethod
+    def _instrument(request, response, start):
+        host = request.url.host
+        latency = time.perf_counter() - start
+        cached = bool(response.extensions.get("from_cache"))
+        # A 304 revalidation still went upstream: its latency counts, its body does not
+        revalidated = bool(response.extensions.get("revalidated"))
+        metrics.increment("http_requests_total", host=host, status=response.status_code)
+        if revalidated:
+            metrics.increment("http_cache_revalidated_total", host=host)
+        elif cached:
+            metrics.increment("http_cache_hits_total", host=host)
+        if revalidated or not cached:
+            metrics.observe("http_request_duration_seconds", latency, host=host)
+
+        def on_close(size):
+            if not cached:
+                metrics.increment("http_response_bytes_total", size, host=host)
+            metrics.event(type="request", method=request.method, host=host, url=str(request.url),
+                          status=response.status_code, cache=cached, revalidated=revalidated, latency=latency,
+                          bytes=size, seconds=time.perf_counter() - start)
+
+        response.stream = _CountingStream(response.stream, on_close)
+        return response
+
+    def close(self):
+        self.transport.close()
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+def _archive_key(request):
+    return f"{request.method} {request.url}"
+
+
+def load_archive(path):
+    """Return the recorded responses of a fixture archive as ``{"METHOD url": record}``."""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class RecordingTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """
+    Capture every response passing through into a gzip-compressed JSON fixture archive.
+
+    Records are keyed by method and URL; a later response for the same request
+    replaces the earlier one. The archive is written when the transport is
+    closed (with its client), merged with whatever the file already holds.
+    """
+
+    def __init__(self, transport, path):
+        self.transport = transport
+        self.path = path
+        self.records = {}
+        self._lock = threading.Lock()
+
+    def _record(self, request, response, body):
+        with self._lock:
+            self.records[_archive_key(request)] = {
+                "status": response.status_code,
+                "headers": response.headers.multi_items(),
+                "body": base64.b64encode(body).decode("ascii"),
+            }
+        return httpx.Response(response.status_code, headers=response.headers.multi_items(),
+                              stream=httpx.ByteStream(body), request=request, extensions=response.extensions)
+
+    def handle_request(self, request):
+        response = self.transport.handle_request(request)
+        try:
+            body = b"".join(response.stream)
+        finally:
+            response.close()
+        return self._record(request, response, body)
+
+    async def handle_async_request(self, request):
+        response = await self.transport.handle_async_request(request)
+        try:
+            body = b"".join([chunk async for chunk in response.stream])
+        finally:
+            await response.aclose()
+        return self._record(request, response, body)
+
+    def save(self):
+        """Write the records into the archive, keeping the ones already in it."""
+        with self._lock:
+            records = load_archive(self.path) if os.path.exists(self.path) else {}
+            records.update(self.records)
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with gzip.open(tmp, "wt", encoding="utf-8") as f:
+                json.dump(records, f, sort_keys=True)
+            os.replace(tmp, self.path)
+
+    def close(self):
+        self.save()
+        self.transport.close()
+
+    async def aclose(self):
+        self.save()
+        await self.transport.aclose()
+
+
+class ReplayTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """
+    Answer requests from a fixture archive written by ``RecordingTransport``, without any network.
+
+    A request that was never recorded fails with ``httpx.ConnectError``, like
+    an unreachable host would.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.records = load_archive(path)
+
+    def handle_request(self, request):
+        record = self.records.get(_archive_key(request))
+        if record is None:
+            raise httpx.ConnectError(f"No recorded response for {_archive_key(request)} in {self.path}",
+                                     request=request)
+        return httpx.Response(record["status"], headers=record["headers"],
+                              stream=httpx.ByteStream(base64.b64decode(record["body"])), request=request)
+
+    async def handle_async_request(self, request):
+        return self.handle_request(request)
@@ -1,12 +1,250 @@
+import functools
+import json
 import re
+import threading
+from dataclasses import dataclass
+
+import metrics
+
+# httpx is only imported once a client is made, so importing utils (e.g. for
+# versions or the catalog loader) stays cheap; DEFAULT_TIMEOUT and
+# DEFAULT_LIMITS are built on first access through the module __getattr__.
+_shared_client = None
+_shared_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def _defaults():
+    import httpx
+
+    return {
+        "DEFAULT_TIMEOUT": httpx.Timeout(30.0, connect=10.0),
+        "DEFAULT_LIMITS": httpx.Limits(max_connections=32, max_keepalive_connections=16, keepalive_expiry=30.0),
+    }
+
+
+def __getattr__(name):
+    if name in ("DEFAULT_TIMEOUT", "DEFAULT_LIMITS"):
+        return _defaults()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def http2_available():
+    """Return True when the optional ``h2`` package needed for HTTP/2 is installed."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _client_options(timeout, limits, http2, kwargs):
+    options = {
+        "timeout": _defaults()["DEFAULT_TIMEOUT"] if timeout is None else timeout,
+        "limits": _defaults()["DEFAULT_LIMITS"] if limits is None else limits,
+        "http2": http2_available() if http2 is None else http2,
+    }
+    options.update(kwargs)
+    return options
+
+
+def _transport_stack(options, cache, record, replay, retry, asynchronous):
+    """Build the transport of a client: network (or replay), retries, then cache, recorder and stage timing."""
+    import httpx
+
+    import transports
+
+    transport = options.pop("transport", None)
+    if replay is not None:
+        transport = transports.ReplayTransport(replay)
+    if transport is None:
+        transport_class = httpx.AsyncHTTPTransport if asynchronous else httpx.HTTPTransport
+        transport = transport_class(http2=options["http2"], limits=options["limits"],
+                                    **{k: options[k] for k in ("verify", "cert", "trust_env") if k in options})
+    if retry is None:
+        retry = transports.RetryPolicy()
+    if retry and replay is None:
+        retry_class = transports.AsyncRetryTransport if asynchronous else transports.RetryTransport
+        transport = retry_class(transport, retry)
+    if cache is not None:
+        caching_class = transports.AsyncCachingTransport if asynchronous else transports.CachingTransport
+        transport = caching_class(transport, cache)
+    if record is not None:
+        transport = transports.RecordingTransport(transport, record)
+    options["transport"] = transports.TimingTransport(transport)
+    return options
+
+
+def make_client(timeout=None, limits=None, http2=None, cache=None, record=None, replay=None, retry=None,
+                **kwargs):
+    """
+    Create a pooled ``httpx.Client`` with keep-alive connections.
+
+    Args:
+        timeout: An ``httpx.Timeout`` or seconds (default: 30s, 10s to connect)
+        limits: An ``httpx.Limits`` for the connection pool
+        http2: Negotiate HTTP/2 with hosts that support it (default: when ``h2`` is installed)
+        cache: A ``transports.HttpCache`` to revalidate GET requests against
+        record: Path of a fixture archive to record every response into, written on close
+        replay: Path of a fixture archive to answer requests from instead of the network
+        retry: A ``transports.RetryPolicy`` for failed and throttled requests
+            (default: ``RetryPolicy()``, False: never retry)
+        **kwargs: Passed through to ``httpx.Client`` (headers, transport, ...)
+    """
+    import httpx
+
+    options = _client_options(timeout, limits, http2, kwargs)
+    return httpx.Client(**_transport_stack(options, cache, record, replay, retry, asynchronous=False))
+
+
+def make_async_client(timeout=None, limits=None, http2=None, cache=None, record=None, replay=None, retry=None,
+                      **kwargs):
+    """Create a pooled ``httpx.AsyncClient``, see ``make_client`` for the arguments."""
+    import httpx
+
+    options = _client_options(timeout, limits, http2, kwargs)
+    return httpx.AsyncClient(**_transport_stack(options, cache, record, replay, retry, asynchronous=True))
+
+
+def shared_client():
+    """Return the process-wide client used by every scraper, creating it on first use."""
+    global _shared_client
+    with _shared_lock:
+        if _shared_client is None or _shared_client.is_closed:
+            _shared_client = make_client()
+        return _shared_client
+
+
+def set_shared_client(client):
+    """Replace the process-wide client, e.g. with one using custom timeouts or limits."""
+    global _shared_client
+    with _shared_lock:
+        _shared_client = client
+
+
+def close_shared_client():
+    """Close the process-wide client and its pooled connections."""
+    global _shared_client
+    with _shared_lock:
+        if _shared_client is not None:
+            _shared_client.close()
+        _shared_client = None
+
+
+def stream_lines(url, client=None, **kwargs):
+    """
+    Yield the lines of a text response as they arrive.
+
+    The body is decoded incrementally instead of being read whole. Close the
+    generator (e.g. with ``contextlib.closing``) to stop reading early; this
+    also closes the response.
+
+    Args:
+        url: The URL to GET
+        client: The client to use (default: the shared client)
+        **kwargs: Passed through to ``client.stream``
+    """
+    client = client if client is not None else shared_client()
+    with client.stream("GET", url, **kwargs) as response:
+        response.raise_for_status()
+        yield from response.iter_lines()
+
+
+def stream_text(url, client=None, **kwargs):
+    """Yield the decoded text chunks of a response as they arrive, see ``stream_lines``."""
+    client = client if client is not None else shared_client()
+    with client.stream("GET", url, **kwargs) as response:
+        response.raise_for_status()
+        yield from response.iter_text()
+
+
+def iter_json_array(chunks):
+    """
+    Yield the items of a top-level JSON array as soon as each one is complete.
+
+    Args:
+        chunks: An iterable of text chunks, e.g. from ``stream_text``. The
+            array items must be objects, arrays or strings, whose end is
+            unambiguous in a partial document.
+
+    Raises:
+        ValueError: If the text is not a JSON array or ends before the array does.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    started = False
+    for chunk in chunks:
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos == len(buffer):
+                break
+            if not started:
+                if buffer[pos] != "[":
+                    raise ValueError("Expected a JSON array")
+                started = True
+                pos += 1
+                continue
+            if buffer[pos] == "]":
+                return
+            try:
+                with metrics.phase("parse"):
+                    item, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                break  # the item is not complete yet, wait for more text
+            yield item
+    raise ValueError("JSON array ended unexpectedly")
+
+
+@functools.lru_cache(maxsize=None)
+def html_parser():
+    """Return the fastest installed BeautifulSoup tree builder: ``lxml`` if available, else ``html.parser``."""
+    try:
+        import lxml  # noqa: F401
+    except ImportError:
+        return "html.parser"
+    return "lxml"
+
+
+def make_soup(markup, parse_only=None, parser=None):
+    """
+    Parse HTML with the fastest available parser.
+
+    Args:
+        markup: HTML text or bytes
+        parse_only: A ``bs4.SoupStrainer`` (or tag name) so only the matching
+            subtrees are built instead of the whole document
+        parser: Force a tree builder, e.g. ``"html.parser"``
+
+    Returns:
+        A ``BeautifulSoup`` object.
+    """
+    from bs4 import BeautifulSoup, SoupStrainer
+
+    if isinstance(parse_only, str):
+        parse_only = SoupStrainer(parse_only)
+    with metrics.phase("parse"):
+        return BeautifulSoup(markup, parser or html_parser(), parse_only=parse_only)
+
+
+_VERSION_SEPARATORS = re.compile(r'\.|-')
+
 
 class VersionHandling:
     """Utilities for handling version strings."""
 
     @staticmethod
+    @functools.lru_cache(maxsize=8192)
     def v2tuple(v):
-        """Convert a version string to a tuple of integers for comparison."""
-        parts = re.split(r'\.|-', v)
+        """Convert a version string to a tuple of integers for comparison.
+
+        Results are memoized, so repeated comparisons against the same bounds
+        and sort keys of already seen versions cost a dictionary lookup.
+        """
+        parts = _VERSION_SEPARATORS.split(v)
         nums = []
         for part in parts:
             if part.isdigit():
@@ -21,6 +259,24 @@ class VersionHandling:
         return VersionHandling.v2tuple(version)
 
 
+def sort_versions(items, key=None, reverse=True):
+    """
+    Sort version strings, newest first by default.
+
+    Args:
+        items: Version strings, or records whose version ``key`` returns
+        key: Function returning the version string of an item
+        reverse: Sort in descending order
+
+    Returns:
+        A new sorted list; each version is parsed once.
+    """
+    v2tuple = VersionHandling.v2tuple
+    if key is None:
+        return sorted(items, key=v2tuple, reverse=reverse)
+    return sorted(items, key=lambda item: v2tuple(key(item)), reverse=reverse)
+
+
 class SimpleVersion:
     def __init__(self, v):
         """
@@ -90,3 +346,159 @@ class SimpleVersion:
         """
         return f"SimpleVersion({self.parts})"
 
+
+
+# Display names of the OSes the assets are grouped by, in output order
+ALL_OS = ("Windows", "Linux", "macOS")
+
+
+@dataclass(slots=True)
+class Release:
+    """
+    One downloadable file of a product release.
+
+    A file offered unchanged for several OSes (e.g. a ``.phar`` or a source
+    tarball) is a single record listing all of them in ``os``, instead of one
+    copy per OS.
+    """
+
+    version: str
+    link: str
+    os: tuple = ALL_OS
+    arch: str = ""
+    gpg: str = ""
+    # "<algorithm>:<hex digest>" of the file, e.g. "sha256:9f86d0...", or "" when unknown
+    checksum: str = ""
+
+    def to_dict(self):
+        """Return the ``{"version", "gpg", "link"}`` entry written to the assets, plus its ``checksum`` if known."""
+        entry = {"version": self.version, "gpg": self.gpg, "link": self.link}
+        if self.checksum:
+            entry["checksum"] = self.checksum
+        return entry
+
+
+def serialize_releases(product, releases, os_names=ALL_OS, skip_empty=False):
+    """
+    Group releases into the ``{product: [{"os": ..., "data": [...]}]}`` asset shape.
+
+    Args:
+        product: The top-level key, e.g. "nginx"
+        releases: ``Release`` records, in the order they should be listed
+        os_names: The OS groups to emit, in order
+        skip_empty: Leave out OS groups without any release
+
+    Returns:
+        The JSON-ready dict; one entry dict is shared by all OS groups of a release.
+    """
+    grouped = {os_name: [] for os_name in os_names}
+    for release in releases:
+        entry = release.to_dict()
+        for os_name in release.os:
+            grouped.setdefault(os_name, []).append(entry)
+    return {product: [{"os": os_name, "data": data} for os_name, data in grouped.items() if data or not skip_empty]}
+
+
+# Marker and version placeholder of catalogs packed by catalog.pack_catalog
+PACKED_FORMAT = "entydata-packed"
+VERSION_PLACEHOLDER = "{version}"
+
+
+def unpack_catalog(packed):
+    """Decode a catalog packed by ``catalog.pack_catalog`` back into the ``catalog.json`` document."""
+    strings = packed["strings"]
+    products = {}
+    for name, product in packed["products"].items():
+        count = product["count"]
+        columns = {}
+        for column, refs in product["columns"].items():
+            columns[column] = [None if ref is None else strings[ref] for ref in refs]
+        columns.update(product["raw"])
+        versions = columns.get("version", [None] * count)
+        for column in product["templates"]:
+            columns[column] = [value if value is None or version is None else value.replace(VERSION_PLACEHOLDER, version)
+                               for value, version in zip(columns[column], versions)]
+        fields = [(column, columns[column]) for column in product["fields"]]
+        entries = [{column: values[i] for column, values in fields if values[i] is not None} for i in range(count)]
+        products[name] = [{"os": strings[os_ref], "data": [entries[row] for row in rows]}
+                          for os_ref, rows in zip(product["os"], product["groups"])]
+    document = {"schema": packed["schema"]}
+    if packed.get("revision") is not None:
+        document["revision"] = packed["revision"]
+    document.update(hash=packed["hash"], generated_at=packed["generated_at"], products=products)
+    return document
+
+
+def apply_delta(document, delta):
+    """
+    Patch a catalog document with a delta from ``catalog.delta_since`` (e.g. ``/catalog?since=N``).
+
+    Removals go first, then the added entries are put in their OS group, and
+    the groups the delta changed are laid out in the delta's ``order`` and
+    ``groups``, so the result matches the server's catalog exactly (deltas
+    without an ``order`` keep each changed group newest version first).
+    Returns the patched document at the delta's revision and hash (check it
+    with ``catalog.content_hash``); ``document`` itself is left as it is.
+    """
+    if document.get("revision") != delta["from"]:
+        raise ValueError(f"Delta from revision {delta['from']} does not apply to revision {document.get('revision')}")
+    removed = {tuple(key) for key in delta["removed"]}
+    products = {
+        product: [{**group, "data": [entry for entry in group["data"]
+                                     if (product, group["os"], entry.get("version"), entry.get("link")) not in removed]}
+                  for group in groups]
+        for product, groups in document["products"].items()
+    }
+
+    def group_of(product, os_name):
+        groups = products.setdefault(product, [])
+        group = next((group for group in groups if group["os"] == os_name), None)
+        if group is None:
+            group = {"os": os_name, "data": []}
+            groups.append(group)
+        return group
+
+    touched = set()
+    for product, os_name, entry in delta["added"]:
+        group_of(product, os_name)["data"].append(entry)
+        touched.add((product, os_name))
+    if "order" not in delta:
+        for product, os_name in touched:
+            group_of(product, os_name)["data"].sort(
+                key=lambda entry: VersionHandling.v2tuple(entry.get("version") or ""), reverse=True)
+    for product, os_name, keys in delta.get("order", ()):
+        group = group_of(product, os_name)
+        entries = {(entry.get("version"), entry.get("link")): entry for entry in group["data"]}
+        try:
+            group["data"] = [entries[tuple(key)] for key in keys]
+        except KeyError as e:
+            raise ValueError(f"Delta orders {product} {os_name} entry {list(e.args[0])} the document does not have")
+    for product, os_names in delta.get("groups", ()):
+        if os_names is None:
+            products.pop(product, None)
+            continue
+        by_os = {group["os"]: group for group in products.get(product, [])}
+        products[product] = [by_os.get(os_name) or {"os": os_name, "data": []} for os_name in os_names]
+    return {**document, "revision": delta["to"], "hash": delta.get("hash"), "products": dict(sorted(products.items()))}
+
+
+def load_catalog(path):
+    """
+    Load a catalog written by ``catalog.py`` in any of its formats.
+
+    ``catalog.json`` and ``catalog.min.json`` are plain JSON,
+    ``catalog.packed.json`` and ``catalog.msgpack`` (which needs the optional
+    ``msgpack`` package) are unpacked. Every format returns the same
+    ``{"schema", "hash", "generated_at", "products"}`` document.
+    """
+    if str(path).endswith(".msgpack"):
+        import msgpack
+
+        with open(path, "rb") as f:
+            document = msgpack.unpackb(f.read(), raw=False)
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            document = json.load(f)
+    if document.get("format") == PACKED_FORMAT:
+        document = unpack_catalog(document)
+    return document